@@ -0,0 +1,34 @@
+"""
+Incrementally maintained set of backlogged UEs
+"""
+from bisect import bisect_left, insort
+
+
+class ActiveSet:
+    """Backlogged UEs kept in ue_id order.
+    
+    UEs add themselves when a packet enters an empty buffer and remove
+    themselves when their buffer drains, so schedulers only look at
+    backlogged UEs (in the same order as the full UE list).
+    """
+    def __init__(self):
+        self.ids = []
+        self.members = {}
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def add(self, ue):
+        """Mark ue as backlogged"""
+        if ue.ue_id not in self.members:
+            insort(self.ids, ue.ue_id)
+            self.members[ue.ue_id] = ue
+    
+    def discard(self, ue):
+        """Mark ue as idle"""
+        if self.members.pop(ue.ue_id, None) is not None:
+            del self.ids[bisect_left(self.ids, ue.ue_id)]
+    
+    def ues(self):
+        """Backlogged UEs in ue_id order"""
+        return [self.members[ue_id] for ue_id in self.ids]
@@ -0,0 +1,243 @@
+"""
+Benchmark suite for simulator scaling
+
+Times Simulator.run and scheduler selection across a grid of UE counts,
+simulation lengths, arrival rates and traffic mixes, and compares the
+results with a stored JSON baseline.
+    
+    python benchmark.py                  # run and compare with the baseline
+    python benchmark.py --save-baseline  # run and store the results as baseline
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from simulator import Simulator
+from schedulers import SCHEDULERS
+from config import Config, BENCHMARK_BASELINE, BENCHMARK_TOLERANCE
+
+
+BENCHMARK_SCHEDULER = 'Proportional Fair'
+MIXES = {
+    'default': {'eMBB': 0.5, 'URLLC': 0.3, 'mMTC': 0.2},
+    'urllc_heavy': {'eMBB': 0.2, 'URLLC': 0.7, 'mMTC': 0.1},
+    'mmtc_heavy': {'eMBB': 0.2, 'URLLC': 0.1, 'mMTC': 0.7}
+}
+
+
+def run_case(num_ues, ttis, arrival_rate=0.5, mix='default', vectorized=True):
+    """One Simulator.run benchmark case"""
+    engine = 'vectorized' if vectorized else 'object'
+    return {
+        'kind': 'run',
+        'name': f"run ues={num_ues} ttis={ttis} rate={arrival_rate} mix={mix} engine={engine}",
+        'num_ues': num_ues, 'ttis': ttis, 'arrival_rate': arrival_rate, 'mix': mix,
+        'vectorized': vectorized
+    }
+
+
+def select_case(num_ues, scheduler_name, warmup=50):
+    """One scheduler selection benchmark case, timed on a warmed-up population"""
+    return {
+        'kind': 'select',
+        'name': f"select ues={num_ues} scheduler={scheduler_name}",
+        'num_ues': num_ues, 'ttis': warmup, 'arrival_rate': 0.5, 'mix': 'default',
+        'vectorized': True, 'scheduler': scheduler_name
+    }
+
+
+def default_cases():
+    """Scaling in NUM_UES per engine, then load, traffic mix and horizon at 100 UEs"""
+    cases = []
+    for num_ues, ttis in [(20, 1000), (100, 1000), (1000, 200), (10000, 200)]:
+        cases.append(run_case(num_ues, ttis))
+        if num_ues <= 1000:
+            cases.append(run_case(num_ues, ttis if num_ues <= 100 else 100, vectorized=False))
+    for arrival_rate in [0.1, 0.9]:
+        cases.append(run_case(100, 1000, arrival_rate=arrival_rate))
+    for mix in ['urllc_heavy', 'mmtc_heavy']:
+        cases.append(run_case(100, 1000, mix=mix))
+    cases.append(run_case(100, 5000))
+    for num_ues in [20, 1000, 10000]:
+        for scheduler_name in SCHEDULERS:
+            cases.append(select_case(num_ues, scheduler_name))
+    return cases
+
+
+def case_config(case):
+    """Simulation parameters of one case"""
+    return Config(NUM_UES=case['num_ues'], SIMULATION_TIME=case['ttis'],
+                  PACKET_ARRIVAL_RATE=case['arrival_rate'], TRAFFIC_MIX=MIXES[case['mix']],
+                  VERBOSE=False)
+
+
+def new_simulator(case):
+    """Simulator of one case, seeded identically every time"""
+    config = case_config(case)
+    scheduler = SCHEDULERS[case.get('scheduler', BENCHMARK_SCHEDULER)](config)
+    return Simulator(scheduler, vectorized=case['vectorized'], rng=np.random.default_rng(0),
+                     config=config)
+
+
+def time_run(case, repeat):
+    """Best-of-repeat wall time of a full run; rates are per simulated TTI"""
+    best = float('inf')
+    for _ in range(repeat):
+        sim = new_simulator(case)
+        start = time.perf_counter()
+        sim.run()
+        best = min(best, time.perf_counter() - start)
+    return {
+        'seconds': best,
+        'ttis_per_s': case['ttis'] / best,
+        'ue_ttis_per_s': case['ttis'] * case['num_ues'] / best
+    }
+
+
+def time_select(case, repeat, calls=200):
+    """Per-call time of select_ue on UE objects and select_index on the array state"""
+    sim = new_simulator(case)
+    sim.advance(case['ttis'])
+    t = sim.current_time
+    scheduler = sim.scheduler
+    
+    result = {}
+    ue_calls = max(1, calls * 20 // case['num_ues'])
+    for label, func, n in [
+        ('select_ue', lambda: scheduler.select_ue(sim.ues, t), ue_calls),
+        ('select_index', lambda: scheduler.select_index(sim.population.scheduling_state(t)), calls)
+    ]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(n):
+                func()
+            best = min(best, (time.perf_counter() - start) / n)
+        result[f'{label}_us'] = best * 1e6
+        result[f'{label}_ues_per_s'] = case['num_ues'] / best
+    return result
+
+
+def peak_memory(case):
+    """Peak traced allocation (MiB) while building and running the simulator once"""
+    tracemalloc.start()
+    try:
+        sim = new_simulator(case)
+        if case['kind'] == 'run':
+            sim.run()
+        else:
+            sim.advance(case['ttis'])
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(cases, repeat=3, memory=True):
+    """Measure every case; returns {case name: measurements}"""
+    results = {}
+    for case in cases:
+        if case['kind'] == 'run':
+            measured = time_run(case, repeat)
+        else:
+            measured = time_select(case, repeat)
+        if memory:
+            measured['peak_mib'] = peak_memory(case)
+        results[case['name']] = measured
+        print(format_result(case['name'], measured))
+    return results
+
+
+def format_result(name, measured):
+    """One report line"""
+    if 'ttis_per_s' in measured:
+        rates = f"{measured['ttis_per_s']:>10.0f} TTI/s {measured['ue_ttis_per_s']:>12.0f} UE-TTI/s"
+    else:
+        rates = f"{measured['select_ue_us']:>10.1f} us/select_ue {measured['select_index_us']:>9.1f} us/select_index"
+    memory = f"{measured['peak_mib']:>8.1f} MiB" if 'peak_mib' in measured else ''
+    return f"{name:<62} {rates} {memory}"
+
+
+# Higher is better for rates, lower is better for times and memory
+HIGHER_IS_BETTER = {'ttis_per_s', 'ue_ttis_per_s', 'select_ue_ues_per_s', 'select_index_ues_per_s'}
+COMPARED = HIGHER_IS_BETTER | {'peak_mib'}
+
+
+def find_regressions(results, baseline, tolerance=BENCHMARK_TOLERANCE):
+    """(case, metric, baseline, current) for every metric worse than baseline by > tolerance"""
+    regressions = []
+    for name, measured in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED & measured.keys() & previous.keys():
+            old, new = previous[metric], measured[metric]
+            if metric in HIGHER_IS_BETTER:
+                worse = new < old * (1 - tolerance)
+            else:
+                worse = new > old * (1 + tolerance)
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def environment():
+    """Machine and library versions, stored with the baseline"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.system()
+    }
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulator scaling benchmarks")
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE,
+                        help="relative slowdown or memory growth flagged as a regression")
+    parser.add_argument('--repeat', type=int, default=3, help="timed repetitions per case (best is kept)")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this text")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak-memory pass")
+    args = parser.parse_args(argv)
+    
+    cases = [case for case in default_cases() if args.filter in case['name']]
+    results = run_benchmarks(cases, args.repeat, memory=not args.no_memory)
+    
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    
+    try:
+        baseline = load_baseline(args.baseline)
+    except FileNotFoundError:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 0
+    print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+    for name, metric, old, new in regressions:
+        print(f"  {name}: {metric} {old:.4g} -> {new:.4g} ({new / old - 1:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Checkpoint and resume of simulator state
+"""
+import os
+import pickle
+import zlib
+
+
+MAGIC = b'NRSIMCK1'
+
+
+def dumps(simulator):
+    """Serialize the full state of a Simulator to compact bytes"""
+    return MAGIC + zlib.compress(pickle.dumps(simulator, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def loads(data):
+    """Rebuild a Simulator from dumps() output"""
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a simulator checkpoint")
+    return pickle.loads(zlib.decompress(data[len(MAGIC):]))
+
+
+def save(simulator, path):
+    """Write a checkpoint atomically (a crash mid-write keeps the previous one)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(simulator))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load(path):
+    """Read a checkpoint written by save()"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,163 @@
+"""
+Cohort model of massive low-rate device populations (e.g. mMTC sensors)
+"""
+import numpy as np
+from schedulers import SchedulingState
+from traffic import arrival_model, BernoulliArrivals, PoissonArrivals
+from config import Config
+
+
+def step_cqi(counts, rng, stride):
+    """CQI random walk of device counts in place; the CQI level of flat index k is k // stride.
+    
+    Same step distribution as UEPopulation.update_cqi (-1/0/+1 with
+    0.2/0.6/0.2), clipped at the lowest and highest level. Only occupied
+    states are drawn.
+    """
+    flat = counts.reshape(-1)
+    occupied = np.flatnonzero(flat)
+    if not occupied.size:
+        return
+    n = flat[occupied]
+    down = rng.binomial(n, 0.2)
+    up = rng.binomial(n - down, 0.25)
+    level = occupied // stride
+    levels = flat.size // stride
+    flat[occupied] -= down + up
+    np.add.at(flat, np.where(level > 0, occupied - stride, occupied), down)
+    np.add.at(flat, np.where(level < levels - 1, occupied + stride, occupied), up)
+
+
+class CohortPopulation:
+    """Statistically identical devices of one traffic class, kept as counts per state.
+    
+    A device is idle or holds one packet; a packet arriving at a device
+    that is still waiting is dropped. Idle devices are counted per CQI
+    level, waiting ones per CQI level and arrival TTI (a ring over the delay
+    threshold), so memory and per-TTI work depend on the number of states,
+    not of devices. Every occupied waiting state is one schedulable row.
+    """
+    def __init__(self, traffic_type, num_devices, rng, streaming=None, config=None):
+        config = config or Config()
+        params = config.TRAFFIC_TYPES[traffic_type]
+        self.traffic_type = traffic_type
+        self.num_devices = num_devices
+        self.rng = rng
+        self.streaming = streaming
+        self.priority = params['priority']
+        self.delay_threshold = params['delay_threshold']
+        self.packet_size = params['packet_size']
+        self.cqi_min = config.CQI_MIN
+        self.levels = config.CQI_MAX - config.CQI_MIN + 1
+        
+        # Probability that a device receives a packet in a TTI
+        model = arrival_model(params.get('arrival'), config.PACKET_ARRIVAL_RATE)
+        if isinstance(model, BernoulliArrivals):
+            self.arrival_probability = model.rate
+        elif isinstance(model, PoissonArrivals):
+            self.arrival_probability = -np.expm1(-model.rate)
+        else:
+            raise ValueError(f"Cohort traffic {traffic_type!r} needs a bernoulli or poisson arrival model")
+        
+        self.idle = rng.multinomial(num_devices, np.full(self.levels, 1 / self.levels))
+        # Column a % ring holds devices waiting since TTI a; a column is dropped
+        # (delay_threshold + 1 TTIs) before it is reused
+        self.ring = self.delay_threshold + 2
+        self.waiting = np.zeros((self.levels, self.ring), dtype=np.int64)
+        self.num_states = self.waiting.size
+        self.backlogged = 0
+        self.avg_throughput = 0.001  # Of the cohort as one schedulable aggregate
+        
+        self.total_throughput = 0
+        self.transmissions = 0
+        self.total_delay = 0
+        self.delay_sq_sum = 0
+        self.served_packets = 0
+        self.dropped_packets = 0
+    
+    def update_cqi(self):
+        step_cqi(self.idle, self.rng, 1)
+        step_cqi(self.waiting, self.rng, self.ring)
+    
+    def generate_packets(self, current_time):
+        """Idle devices with an arrival start waiting; arrivals at waiting devices are dropped"""
+        arrivals = self.rng.binomial(self.idle, self.arrival_probability)
+        self.idle -= arrivals
+        self.waiting[:, current_time % self.ring] = arrivals
+        self.dropped_packets += int(self.rng.binomial(self.backlogged, self.arrival_probability))
+        self.backlogged += int(arrivals.sum())
+    
+    def drop_expired(self, current_time):
+        """Drop the packets that just exceeded the delay threshold"""
+        column = (current_time - self.delay_threshold - 1) % self.ring
+        expired = self.waiting[:, column]
+        dropped = int(expired.sum())
+        if dropped:
+            self.idle += expired
+            self.waiting[:, column] = 0
+            self.dropped_packets += dropped
+            self.backlogged -= dropped
+    
+    def scheduling_state(self, current_time, offset=0):
+        """One row per occupied waiting state, with ue_ids offset + state index"""
+        states = np.flatnonzero(self.waiting)
+        count = self.waiting.reshape(-1)[states]
+        level, column = np.divmod(states, self.ring)
+        n = states.size
+        return SchedulingState(
+            ue_ids=offset + states,
+            cqi=level + self.cqi_min,
+            avg_throughput=np.full(n, self.avg_throughput),
+            hol_delay=(current_time - column) % self.ring,
+            delay_threshold=np.full(n, self.delay_threshold),
+            priority=np.full(n, self.priority),
+            buffer_size=count * self.packet_size,
+            backlogged=np.ones(n, dtype=bool)
+        )
+    
+    def cqi_of(self, state):
+        return state // self.ring + self.cqi_min
+    
+    def transmit(self, state, current_time, data_rate):
+        """Serve as many waiting devices of one state as their packets fit in data_rate"""
+        level, column = divmod(state, self.ring)
+        served = min(int(self.waiting[level, column]), data_rate // self.packet_size)
+        if served == 0:
+            return 0
+        self.waiting[level, column] -= served
+        self.idle[level] += served
+        self.backlogged -= served
+        
+        delay = (current_time - column) % self.ring
+        self.total_delay += delay * served
+        self.delay_sq_sum += delay * delay * served
+        self.served_packets += served
+        if self.streaming is not None:
+            self.streaming.record_delay(self.traffic_type, delay, served)
+        
+        transmitted = served * self.packet_size
+        self.total_throughput += transmitted
+        self.transmissions += 1
+        self.avg_throughput = 0.9 * self.avg_throughput + 0.1 * transmitted
+        return transmitted
+    
+    def reset_statistics(self, streaming):
+        self.streaming = streaming
+        self.total_throughput = 0
+        self.transmissions = 0
+        self.total_delay = 0
+        self.delay_sq_sum = 0
+        self.served_packets = 0
+        self.dropped_packets = 0
+    
+    def summary(self, measured_ttis):
+        """Cohort-level metrics; throughput is per device"""
+        handled = self.served_packets + self.dropped_packets
+        return {
+            'devices': self.num_devices,
+            'avg_throughput': self.total_throughput / measured_ttis / self.num_devices,
+            'avg_delay': self.total_delay / self.served_packets if self.served_packets else 0,
+            'packet_loss_ratio': self.dropped_packets / handled if handled else 0,
+            'served_packets': self.served_packets,
+            'dropped_packets': self.dropped_packets
+        }
@@ -1,6 +1,7 @@
 """
 Configuration parameters for 5G NR Scheduling Simulation
 """
+import copy
 
 # Simulation Parameters
 NUM_UES = 20
@@ -15,6 +16,11 @@ TRAFFIC_TYPES = {
     'URLLC': {'priority': 3, 'delay_threshold': 10, 'packet_size': 200},
     'mMTC': {'priority': 1, 'delay_threshold': 1000, 'packet_size': 100}
 }
+TRAFFIC_MIX = {'eMBB': 0.5, 'URLLC': 0.3, 'mMTC': 0.2}  # Share of UEs per traffic type
+# A traffic type may add an 'arrival' model (default: Bernoulli at PACKET_ARRIVAL_RATE), e.g.
+#   {'model': 'poisson', 'rate': 4.0}                            packets per TTI
+#   {'model': 'onoff', 'rate': 8.0, 'p_on': 0.01, 'p_off': 0.05}  Poisson while ON
+#   {'model': 'video', 'frame_interval': 16, 'frame_packets': 30}  frame bursts every 16 TTIs
 
 # Channel Model
 CQI_MIN = 1
@@ -30,6 +36,100 @@ GAMMA = 0.2  # Priority weight
 MAX_BUFFER_SIZE = 15000  # bytes (increased to reduce overflow)
 PACKET_ARRIVAL_RATE = 0.5  # probability per TTI (reduced load)
 
+# Engine
+VECTORIZED_UES = False  # Array-backed UE population (for large NUM_UES)
+FREQUENCY_SELECTIVE = False  # Per-RB CQI and allocation of all NUM_RBS per TTI
+PREGENERATED_TRACES = False  # Draw CQI walks and arrivals in bulk trace chunks
+TRACE_CHUNK_SIZE = 1000  # TTIs per trace chunk
+TRACE_DIR = None  # Replay traces recorded with traces.record_traces from this directory
+EVENT_DRIVEN = False  # Skip idle TTIs up to the next trace arrival (needs traces)
+LOOKAHEAD_WINDOW = 1  # TTIs planned per scheduler call (> 1 needs traces and VECTORIZED_UES; delay-aware schedulers may decide differently)
+DEADLINE_WHEEL = True  # Check expiry only for UEs with a deadline due this TTI
+INSTRUMENT_LATENCY = False  # Record per-phase wall-clock latency of every TTI
+
+# Cohorts
+COHORT_TYPES = {}  # {traffic type: devices} modelled as state counts, e.g. {'mMTC': 100000}
+
+# Observers
+OBSERVERS = ()  # Built-in observers by name: 'profile', 'starvation', 'drops'
+STARVATION_TTIS = 100  # Backlogged TTIs without service that count as starvation
+PROFILE_SAMPLE_EVERY = 1  # Profile one TTI in every this many
+
+# Streaming Metrics
+THROUGHPUT_WINDOW = 100  # TTIs per windowed-throughput sample
+
+# Time-Series Recording
+RECORD_DIR = None  # Write per-TTI, per-UE series to this directory
+RECORD_BLOCK_SIZE = 10000  # TTIs per preallocated block / compressed chunk
+
+# Checkpointing
+CHECKPOINT_EVERY = None  # Save the full simulator state every N TTIs
+CHECKPOINT_PATH = None  # Checkpoint file (overwritten atomically)
+
+# Replication
+RANDOM_SEED = 42  # First seed; seeds RANDOM_SEED .. RANDOM_SEED + NUM_SEEDS - 1
+NUM_SEEDS = 1  # Independent realisations per scheduler
+NUM_WORKERS = None  # Worker processes (None = all cores)
+WARMUP_TIME = 0  # TTIs simulated once per seed and shared by all schedulers (not measured)
+WARMUP_SCHEDULER = 'Round Robin'  # Scheduler driving the shared warm-up
+ADAPTIVE_REPLICATION = False  # Replicate until confidence intervals are narrow (replaces NUM_SEEDS)
+CI_CONFIDENCE = 0.95  # Confidence level of the intervals
+CI_RELATIVE_WIDTH = 0.05  # Target CI width relative to the mean
+MIN_REPLICAS = 3  # Replicas per scheduler before checking the intervals
+MAX_REPLICAS = 100  # Replica cap per scheduler
+
+# Benchmarks
+BENCHMARK_BASELINE = 'benchmark_baseline.json'  # Stored results of benchmark.py
+BENCHMARK_TOLERANCE = 0.2  # Relative slowdown / memory growth flagged as a regression
+
+# Multi-Cell
+NUM_CELLS = 7  # Cells of a multi-cell network (one worker process each)
+CELL_SYNC_INTERVAL = 10  # TTIs between load/handover exchanges of the cells
+INTERFERENCE_CQI_LOSS = 4.0  # CQI steps lost per unit of coupling-weighted neighbour load
+MOBILITY_SIGMA = 0.02  # Std of the log neighbour coupling change per TTI
+HANDOVER_HYSTERESIS = 1.25  # Neighbour / serving signal ratio that triggers a handover
+
+# Parameter Sweeps
+SWEEP_CACHE_DIR = '.sweep_cache'  # Content-addressed cache of sweep results
+
+# Scheduling Service
+SERVICE_SOCKET = '/tmp/nr_scheduler.sock'  # Unix socket of the scheduling service
+SERVICE_PORT = 8765  # Localhost TCP port where Unix sockets are unavailable
+SERVICE_MAX_BATCH = 256  # Most pending requests evaluated in one batch
+SERVICE_BATCH_WINDOW = 0.0  # Seconds to wait for more requests once one is pending (0: one event-loop pass)
+
 # Output
 VERBOSE = False
 PLOT_RESULTS = True
+REPORT_DIR = None  # Save plots to this directory (headless) instead of showing them
+REPORT_FORMATS = ('png',)  # File formats of saved plots, e.g. ('png', 'svg')
+
+
+class Config:
+    """Simulation parameters as one object; defaults are the module constants above.
+    
+    Config(NUM_UES=100, ALPHA=0.5) overrides individual parameters. A Config
+    is passed into Simulator, UserEquipment and the schedulers, so sweeps
+    vary parameters without editing this file.
+    """
+    def __init__(self, **overrides):
+        params = {name: value for name, value in globals().items() if name.isupper()}
+        unknown = overrides.keys() - params.keys()
+        if unknown:
+            raise TypeError(f"Unknown config parameters: {', '.join(sorted(unknown))}")
+        params.update(overrides)
+        for name, value in params.items():
+            setattr(self, name, copy.deepcopy(value))
+    
+    def replace(self, **changes):
+        """Copy with some parameters changed"""
+        return Config(**{**self.to_dict(), **changes})
+    
+    def to_dict(self):
+        return dict(vars(self))
+    
+    def __eq__(self, other):
+        return isinstance(other, Config) and self.to_dict() == other.to_dict()
+    
+    def __repr__(self):
+        return f"Config({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
@@ -0,0 +1,37 @@
+"""
+Timing wheel of packet expiry deadlines for 5G NR simulation
+"""
+from config import TRAFFIC_TYPES
+
+
+class DeadlineWheel:
+    """Bucketed deadline index keyed by TTI.
+    
+    A packet arriving at TTI t with delay threshold d expires at TTI t + d + 1,
+    which is known when it is enqueued. Each slot holds the UEs (objects or
+    index arrays) with a packet expiring at that TTI, so expiry is checked
+    only where a drop can actually happen. Entries are invalidated lazily:
+    if the packet was transmitted first, checking its UE simply finds no
+    expired head-of-line packet.
+    """
+    def __init__(self, max_delay_threshold=None):
+        if max_delay_threshold is None:
+            max_delay_threshold = max(t['delay_threshold'] for t in TRAFFIC_TYPES.values())
+        # Deadlines lie at most max_delay_threshold + 1 TTIs ahead
+        self.num_slots = max_delay_threshold + 2
+        self.slots = [[] for _ in range(self.num_slots)]
+    
+    def schedule(self, expiry_tti, entry):
+        """Register entry to be checked at expiry_tti"""
+        self.slots[expiry_tti % self.num_slots].append(entry)
+    
+    def pop_due(self, tti):
+        """Remove and return the entries due at tti"""
+        slot = tti % self.num_slots
+        due = self.slots[slot]
+        self.slots[slot] = []
+        return due
+    
+    def clear(self):
+        """Drop all entries (e.g. when every buffer is known to be empty)"""
+        self.slots = [[] for _ in range(self.num_slots)]
@@ -1,12 +1,14 @@
 """
 Main execution script for 5G NR Scheduling Simulation
 """
-import numpy as np
-from simulator import Simulator
-from schedulers import (RoundRobinScheduler, ProportionalFairScheduler, 
-                        MLWDFScheduler, HybridAdaptiveScheduler, EXPRuleScheduler)
+from runner import compare_schedulers
+from replication import replicate
+from schedulers import SCHEDULERS
 from visualizer import Visualizer
-from config import NUM_UES, SIMULATION_TIME, PLOT_RESULTS
+from config import (NUM_UES, SIMULATION_TIME, TRAFFIC_MIX, PLOT_RESULTS, RANDOM_SEED,
+                    NUM_SEEDS, NUM_WORKERS, INSTRUMENT_LATENCY, WARMUP_TIME,
+                    WARMUP_SCHEDULER, ADAPTIVE_REPLICATION, CI_CONFIDENCE,
+                    CI_RELATIVE_WIDTH, REPORT_DIR, COHORT_TYPES)
 
 
 def main():
@@ -14,37 +16,43 @@ def main():
     print("5G NR DOWNLINK SCHEDULING SIMULATION")
     print("="*80)
     print(f"Configuration: {NUM_UES} UEs, {SIMULATION_TIME} TTIs")
-    print(f"Traffic Mix: 50% eMBB, 30% URLLC, 20% mMTC")
+    print(f"Traffic Mix: {', '.join(f'{share:.0%} {name}' for name, share in TRAFFIC_MIX.items())}")
+    if COHORT_TYPES:
+        print(f"Cohorts: {', '.join(f'{devices} {name}' for name, devices in COHORT_TYPES.items())} devices")
+    if ADAPTIVE_REPLICATION:
+        print(f"Replicas: until {CI_CONFIDENCE:.0%} CIs are within {CI_RELATIVE_WIDTH:.0%} of the mean")
+    else:
+        print(f"Seeds: {NUM_SEEDS} (from {RANDOM_SEED})")
+    if WARMUP_TIME:
+        print(f"Shared warm-up: {WARMUP_TIME} TTIs under {WARMUP_SCHEDULER}")
     print("="*80 + "\n")
     
-    # Set random seed for reproducibility
-    np.random.seed(42)
+    # Every scheduler is evaluated on the same seeds, i.e. identical
+    # channel and traffic realisations
+    scheduler_names = list(SCHEDULERS)
+    seeds = list(range(RANDOM_SEED, RANDOM_SEED + NUM_SEEDS))
     
-    # Initialize schedulers
-    schedulers = [
-        RoundRobinScheduler(),
-        ProportionalFairScheduler(),
-        MLWDFScheduler(),
-        EXPRuleScheduler(),
-        HybridAdaptiveScheduler()
-    ]
-    
-    results = []
-    
-    # Run simulations
-    for scheduler in schedulers:
-        print(f"Simulating: {scheduler.name}...")
-        sim = Simulator(scheduler)
-        metrics = sim.run()
-        results.append(metrics)
-        print(f"✓ {scheduler.name} completed\n")
+    # Run simulations (scheduler x seed jobs spread across all cores)
+    print(f"Simulating: {', '.join(scheduler_names)}...")
+    if ADAPTIVE_REPLICATION:
+        results = replicate(scheduler_names, max_workers=NUM_WORKERS)
+    else:
+        results = compare_schedulers(scheduler_names, seeds, max_workers=NUM_WORKERS)
+    for result in results:
+        print(f"✓ {result['scheduler']} completed ({result['num_runs']} runs)")
+    print()
     
     # Display results
     visualizer = Visualizer(results)
     visualizer.print_summary_table()
+    if INSTRUMENT_LATENCY:
+        visualizer.print_latency_table()
     
     # Generate plots
-    if PLOT_RESULTS:
+    if PLOT_RESULTS and REPORT_DIR:
+        print(f"Saving performance plots to {REPORT_DIR}...")
+        visualizer.save_all(REPORT_DIR)
+    elif PLOT_RESULTS:
         print("Generating performance plots...")
         visualizer.plot_all()
     
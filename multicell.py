@@ -0,0 +1,326 @@
+"""
+Multi-cell 5G NR simulation: one process per cell, coupled through interference
+
+Every cell runs its own Simulator and scheduler in a worker process. Cells
+meet at a barrier every CELL_SYNC_INTERVAL TTIs, publishing their load
+(share of busy TTIs) in a shared-memory array and exchanging handed-over
+UEs through per-cell inboxes. Between barriers cells run independently
+on the loads of the previous interval.
+
+Channel model: UE u of cell c sees every other cell j with a relative
+coupling g[u, j] (neighbour signal / serving signal), initialised by ring
+distance and random-walking in log scale with mobility. Interference
+lowers the CQI by INTERFERENCE_CQI_LOSS * sum_j g[u, j] * load[j] steps;
+a UE whose coupling to a neighbour exceeds HANDOVER_HYSTERESIS is handed
+over to it.
+"""
+import multiprocessing
+import queue
+import traceback
+import numpy as np
+from simulator import Simulator
+from schedulers import SCHEDULERS
+from config import Config
+
+
+class CellSimulator(Simulator):
+    """One cell of a network: a vectorized Simulator with interference and handover.
+    
+    Population rows are slots; a slot is attached to a network-wide UE id or
+    free (-1). Rows are appended when a handover arrives and no slot is free.
+    """
+    def __init__(self, cell_id, num_cells, scheduler, rng, config):
+        if (config.FREQUENCY_SELECTIVE or config.PREGENERATED_TRACES or config.TRACE_DIR
+                or config.COHORT_TYPES):
+            raise ValueError("Multi-cell simulation needs the wideband, trace-free engine without cohorts")
+        super().__init__(scheduler, vectorized=True, rng=rng, config=config)
+        self.cell_id = cell_id
+        self.num_cells = num_cells
+        num_ues = config.NUM_UES
+        
+        population = self.population
+        population.widen_queues(max(config.MAX_BUFFER_SIZE // t['packet_size']
+                                    for t in config.TRAFFIC_TYPES.values()))
+        self.ue_id = np.arange(cell_id * num_ues, (cell_id + 1) * num_ues)
+        self.base_cqi = population.cqi.copy()  # CQI random walk without interference
+        
+        # Log coupling to every cell by ring distance; none to the serving cell
+        distance = np.abs(np.arange(num_cells) - cell_id)
+        distance = np.minimum(distance, num_cells - distance)
+        self.log_coupling = rng.normal(-2.0 * distance, 1.0, size=(num_ues, num_cells))
+        self.log_coupling[:, cell_id] = -np.inf
+        
+        self.loads = np.zeros(num_cells)  # Loads of the last interval, own entry unused
+        self.penalty = np.zeros(num_ues, dtype=np.int64)  # CQI steps lost to interference
+        self.busy_ttis = 0
+        self.departed = {}  # Statistics of UEs that left, by UE id
+        self.handovers_out = 0
+    
+    @property
+    def attached(self):
+        return self.ue_id >= 0
+    
+    def update_channel(self):
+        """CQI random walk, then the interference penalty of the neighbour loads"""
+        population = self.population
+        population.cqi = self.base_cqi
+        population.update_cqi()
+        self.base_cqi = population.cqi
+        population.cqi = np.clip(self.base_cqi - self.penalty, self.config.CQI_MIN,
+                                 self.config.CQI_MAX)
+    
+    def update_interference(self, loads):
+        """Set the neighbour loads of the coming interval and the resulting CQI penalties"""
+        self.loads = loads
+        interference = np.exp(self.log_coupling) @ loads
+        self.penalty = np.rint(self.config.INTERFERENCE_CQI_LOSS * interference).astype(np.int64)
+    
+    def generate_arrivals(self):
+        """Packets only for attached slots"""
+        arrivals = self.traffic.counts()[0]
+        self.population.generate_packets(self.current_time, arrivals * self.attached)
+    
+    def transmit(self, decision):
+        transmitted = super().transmit(decision)
+        self.busy_ttis += transmitted > 0
+        return transmitted
+    
+    def interval_load(self, num_ttis):
+        """Share of busy TTIs since the last call"""
+        load = self.busy_ttis / num_ttis
+        self.busy_ttis = 0
+        return load
+    
+    def move(self, sync_interval):
+        """Mobility: one log-normal step of every attached UE's coupling"""
+        steps = self.rng.normal(0.0, self.config.MOBILITY_SIGMA * np.sqrt(sync_interval),
+                                size=self.log_coupling.shape)
+        steps[:, self.cell_id] = 0
+        steps[~self.attached] = 0
+        self.log_coupling += steps
+    
+    def hand_over(self):
+        """Detach UEs with a neighbour stronger than the hysteresis; returns {cell: [UE states]}"""
+        attached = np.flatnonzero(self.attached)
+        strongest = np.argmax(self.log_coupling[attached], axis=1)
+        leaving = self.log_coupling[attached, strongest] > np.log(self.config.HANDOVER_HYSTERESIS)
+        
+        outgoing = {}
+        for row, target in zip(attached[leaving].tolist(), strongest[leaving].tolist()):
+            ue_id = int(self.ue_id[row])
+            counters = self.population.take_counters(row)
+            departed = self.departed.setdefault(ue_id, dict.fromkeys(counters, 0))
+            for name, value in counters.items():
+                departed[name] += value
+            
+            state = self.population.export_ue(row)
+            state['ue_id'] = ue_id
+            state['base_cqi'] = int(self.base_cqi[row])
+            # Re-express the coupling relative to the new serving cell
+            log_coupling = self.log_coupling[row] - self.log_coupling[row, target]
+            log_coupling[self.cell_id] = -self.log_coupling[row, target]
+            log_coupling[target] = -np.inf
+            state['log_coupling'] = log_coupling
+            outgoing.setdefault(target, []).append(state)
+            
+            self.ue_id[row] = -1
+            self.log_coupling[row] = -np.inf
+            self.handovers_out += 1
+        return outgoing
+    
+    def admit(self, states):
+        """Attach handed-over UEs to free slots, appending slots as needed"""
+        free = np.flatnonzero(~self.attached)
+        if free.size < len(states):
+            self.grow(self.population.num_ues + len(states) - free.size)
+            free = np.flatnonzero(~self.attached)
+        
+        for row, state in zip(free.tolist(), states):
+            self.population.import_ue(row, state)
+            self.ue_id[row] = state['ue_id']
+            self.base_cqi[row] = state['base_cqi']
+            self.log_coupling[row] = state['log_coupling']
+            # Queued packets keep their deadlines
+            if self.deadlines is not None:
+                threshold = int(self.population.delay_threshold[row])
+                for expiry in np.unique(state['arrival_times'] + threshold + 1).tolist():
+                    if expiry > self.current_time:
+                        self.deadlines.schedule(expiry, np.array([row]))
+        self.traffic.assign(self.population.traffic_type)
+    
+    def grow(self, num_slots):
+        """Append free slots"""
+        extra = num_slots - self.population.num_ues
+        self.population.resize(num_slots)
+        self.ue_id = np.concatenate([self.ue_id, np.full(extra, -1)])
+        self.penalty = np.concatenate([self.penalty, np.zeros(extra, dtype=np.int64)])
+        self.base_cqi = np.concatenate([self.base_cqi, np.ones(extra, dtype=self.base_cqi.dtype)])
+        self.log_coupling = np.concatenate([self.log_coupling,
+                                            np.full((extra, self.num_cells), -np.inf)])
+    
+    def ue_statistics(self):
+        """Statistics counters per network UE id, including UEs that left"""
+        statistics = {ue_id: dict(counters) for ue_id, counters in self.departed.items()}
+        population = self.population
+        for row in np.flatnonzero(self.attached).tolist():
+            counters = statistics.setdefault(int(self.ue_id[row]),
+                                             dict.fromkeys(population.COUNTER_FIELDS, 0))
+            for name in population.COUNTER_FIELDS:
+                counters[name] += int(getattr(population, name)[row])
+        return statistics
+
+
+class CellLink:
+    """Shared state of a network: double-buffered load and handover-count arrays,
+    one barrier and one inbox queue per cell"""
+    def __init__(self, context, num_cells):
+        self.num_cells = num_cells
+        self.loads = context.RawArray('d', 2 * num_cells)
+        self.handover_counts = context.RawArray('i', 2 * num_cells * num_cells)
+        self.barrier = context.Barrier(num_cells)
+        self.inboxes = [context.Queue() for _ in range(num_cells)]
+    
+    def views(self):
+        """NumPy views of the shared arrays, indexed [parity, ...]"""
+        loads = np.frombuffer(self.loads, dtype=np.float64).reshape(2, self.num_cells)
+        counts = np.frombuffer(self.handover_counts, dtype=np.int32).reshape(
+            2, self.num_cells, self.num_cells)
+        return loads, counts
+
+
+def run_cell(cell_id, scheduler_name, seed, config, link, results):
+    """Worker process body: simulate one cell, synchronising with the others"""
+    try:
+        num_cells = link.num_cells
+        rng = np.random.default_rng([seed, cell_id])
+        sim = CellSimulator(cell_id, num_cells, SCHEDULERS[scheduler_name](config), rng, config)
+        loads, counts = link.views()
+        inbox = link.inboxes[cell_id]
+        early = []  # Handovers of a later interval that arrived ahead of time
+        
+        interval = config.CELL_SYNC_INTERVAL
+        simulation_time = config.SIMULATION_TIME
+        sync = 0
+        interval_start = 0
+        for tti in range(simulation_time):
+            sim.current_time = tti
+            sim.step()
+            if (tti + 1) % interval and tti + 1 < simulation_time:
+                continue
+            
+            # Publish this interval's load and handovers, then wait for every cell
+            parity = sync % 2
+            loads[parity, cell_id] = sim.interval_load(tti + 1 - interval_start)
+            interval_start = tti + 1
+            sim.move(interval)
+            outgoing = sim.hand_over()
+            for target in range(num_cells):
+                counts[parity, cell_id, target] = len(outgoing.get(target, ()))
+            for target, states in outgoing.items():
+                link.inboxes[target].put((sync, cell_id, states))
+            link.barrier.wait()
+            
+            expected = int(counts[parity, :, cell_id].sum())
+            arrived = [message for message in early if message[0] == sync]
+            early = [message for message in early if message[0] != sync]
+            while sum(len(states) for _, _, states in arrived) < expected:
+                message = inbox.get()
+                if message[0] == sync:
+                    arrived.append(message)
+                else:
+                    early.append(message)
+            # Admit by (source cell, UE id), not in inbox order: the slot a UE
+            # lands in decides its arrival draws, so this keeps runs
+            # deterministic per seed
+            arrived = sorted((source, state['ue_id'], state) for _, source, states in arrived
+                             for state in states)
+            if arrived:
+                sim.admit([state for _, _, state in arrived])
+            sim.update_interference(loads[parity].copy())
+            sync += 1
+        
+        results.put((cell_id, {
+            'ue_statistics': sim.ue_statistics(),
+            'handovers_out': sim.handovers_out,
+            'attached': int(sim.attached.sum()),
+            'streaming': sim.streaming
+        }))
+    except BaseException:
+        link.barrier.abort()
+        results.put((cell_id, {'error': traceback.format_exc()}))
+
+
+def simulate_network(scheduler_name, seed, num_cells=None, config=None):
+    """Run a num_cells network with one worker process per cell; returns network metrics"""
+    config = config or Config()
+    num_cells = num_cells or config.NUM_CELLS
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    link = CellLink(context, num_cells)
+    results = context.Queue()
+    workers = [context.Process(target=run_cell,
+                               args=(c, scheduler_name, seed, config, link, results))
+               for c in range(num_cells)]
+    for worker in workers:
+        worker.start()
+    
+    cells = {}
+    try:
+        while len(cells) < num_cells:
+            try:
+                cell_id, result = results.get(timeout=1)
+            except queue.Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    link.barrier.abort()
+                    raise RuntimeError("A cell worker died")
+                continue
+            if 'error' in result:
+                raise RuntimeError(f"Cell {cell_id} failed:\n{result['error']}")
+            cells[cell_id] = result
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+    
+    return network_metrics(scheduler_name, [cells[c] for c in range(num_cells)], config)
+
+
+def network_metrics(scheduler_name, cells, config):
+    """Per-UE and network-wide metrics from the cells' statistics"""
+    statistics = {}
+    for cell in cells:
+        for ue_id, counters in cell['ue_statistics'].items():
+            total = statistics.setdefault(ue_id, dict.fromkeys(counters, 0))
+            for name, value in counters.items():
+                total[name] += value
+    ue_ids = sorted(statistics)
+    total_throughput = np.array([statistics[u]['total_throughput'] for u in ue_ids], dtype=float)
+    total_delay = np.array([statistics[u]['total_delay'] for u in ue_ids], dtype=float)
+    served = np.array([statistics[u]['served_packets'] for u in ue_ids], dtype=float)
+    dropped = np.array([statistics[u]['dropped_packets'] for u in ue_ids], dtype=float)
+    
+    throughput_per_ue = total_throughput / config.SIMULATION_TIME
+    streaming = cells[0]['streaming']
+    for cell in cells[1:]:
+        streaming.merge(cell['streaming'])
+    
+    sum_squared = float(np.sum(throughput_per_ue ** 2))
+    metrics = {
+        'scheduler': scheduler_name,
+        'num_cells': len(cells),
+        'avg_throughput': float(throughput_per_ue.mean()),
+        'avg_delay': float(total_delay.sum() / served.sum()) if served.sum() else 0,
+        'packet_loss_ratio': float(dropped.sum() / (served.sum() + dropped.sum()))
+                             if served.sum() + dropped.sum() else 0,
+        'fairness_index': float(throughput_per_ue.sum() ** 2 / (len(ue_ids) * sum_squared))
+                          if sum_squared else 1,
+        'throughput_per_ue': throughput_per_ue.tolist(),
+        'handovers': sum(cell['handovers_out'] for cell in cells),
+        'ues_per_cell': [cell['attached'] for cell in cells]
+    }
+    metrics.update(streaming.summary())
+    metrics['sketches'] = streaming
+    return metrics
@@ -0,0 +1,213 @@
+"""
+Observer hooks for diagnosing simulation runs
+
+Observers registered with a Simulator are notified at TTI and phase
+boundaries, on scheduling decisions, transmissions and drops. Without
+observers the Simulator runs its plain loop, so they cost nothing unless
+used. TTIs skipped by the event-driven engine are not observed.
+"""
+import cProfile
+import pstats
+import numpy as np
+from config import Config, STARVATION_TTIS, PROFILE_SAMPLE_EVERY
+
+
+class Observer:
+    """Base class of simulation observers; every hook is a no-op.
+    
+    Only hooks a subclass overrides are called. End hooks run in reverse
+    registration order, so observers nest (a profiler registered last sees
+    only the simulation). summary() goes into the run's metrics under
+    'observers', keyed by name.
+    """
+    name = 'observer'
+    
+    def on_run_start(self, sim):
+        pass
+    
+    def on_run_end(self, sim):
+        pass
+    
+    def on_reset_statistics(self, sim):
+        """Called when measurement restarts (e.g. after a warm-up)"""
+    
+    def on_tti_start(self, sim, tti):
+        pass
+    
+    def on_phase_end(self, sim, tti, phase):
+        """phase is one of 'cqi_update', 'arrivals', 'expiry', 'select_ue', 'transmit'"""
+    
+    def on_decision(self, sim, tti, decision):
+        """decision as returned by Simulator.schedule (None if nothing is scheduled)"""
+    
+    def on_transmit(self, sim, tti, decision, transmitted):
+        pass
+    
+    def on_drop(self, sim, tti, phase, drops):
+        """drops maps traffic class to packets dropped in phase ('arrivals' or 'expiry')"""
+    
+    def on_tti_end(self, sim, tti):
+        pass
+    
+    def summary(self):
+        return {}
+
+
+HOOKS = ['on_run_start', 'on_run_end', 'on_reset_statistics', 'on_tti_start', 'on_phase_end',
+         'on_decision', 'on_transmit', 'on_drop', 'on_tti_end']
+END_HOOKS = {'on_run_end', 'on_tti_end'}
+
+
+def hook_table(observers):
+    """{hook name: bound methods of the observers that override it, in call order}"""
+    table = {}
+    for hook in HOOKS:
+        ordered = reversed(observers) if hook in END_HOOKS else observers
+        table[hook] = [getattr(observer, hook) for observer in ordered
+                       if getattr(type(observer), hook) is not getattr(Observer, hook)]
+    return table
+
+
+class ProfileObserver(Observer):
+    """cProfile of the TTI loop, sampling one TTI in every sample_every.
+    
+    Profile data stays in this process; it is not part of checkpoints.
+    """
+    name = 'profile'
+    
+    def __init__(self, sample_every=PROFILE_SAMPLE_EVERY, top=15):
+        self.sample_every = sample_every
+        self.top = top
+        self.profiler = None
+        self.sampled_ttis = 0
+        self._active = False
+    
+    def on_tti_start(self, sim, tti):
+        if tti % self.sample_every == 0:
+            if self.profiler is None:
+                self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            self._active = True
+    
+    def on_tti_end(self, sim, tti):
+        if self._active:
+            self.profiler.disable()
+            self._active = False
+            self.sampled_ttis += 1
+    
+    def stats(self):
+        """pstats.Stats of the sampled TTIs"""
+        return pstats.Stats(self.profiler)
+    
+    def summary(self):
+        """Most expensive functions by own time"""
+        if self.profiler is None:
+            return {'sampled_ttis': 0, 'functions': []}
+        entries = sorted(self.stats().stats.items(), key=lambda item: item[1][2], reverse=True)
+        return {
+            'sampled_ttis': self.sampled_ttis,
+            'functions': [{'function': f"{path}:{line}({func})", 'calls': calls,
+                           'tottime': tottime, 'cumtime': cumtime}
+                          for (path, line, func), (_, calls, tottime, cumtime, _)
+                          in entries[:self.top]]
+        }
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['profiler'] = None
+        state['_active'] = False
+        return state
+
+
+class StarvationObserver(Observer):
+    """UEs left backlogged but unserved for more than threshold TTIs"""
+    name = 'starvation'
+    
+    def __init__(self, threshold=STARVATION_TTIS):
+        self.threshold = threshold
+        self.waiting_since = None  # Per UE: first unserved backlogged TTI, -1 if idle
+        self.longest_wait = None
+        self.starved_ue_ttis = 0
+        self._served = []
+    
+    def on_reset_statistics(self, sim):
+        self.longest_wait = None
+        self.starved_ue_ttis = 0
+    
+    def on_transmit(self, sim, tti, decision, transmitted):
+        if decision is None:
+            return
+        if sim.frequency_selective:
+            self._served = decision[0][np.asarray(transmitted) > 0].tolist()
+        elif transmitted:
+            self._served = [decision if sim.population is not None else decision.ue_id]
+    
+    def on_tti_end(self, sim, tti):
+        if sim.population is not None:
+            backlogged = sim.population.count > 0
+        else:
+            backlogged = np.array([len(ue.buffer) > 0 for ue in sim.ues])
+        if self.waiting_since is None or self.waiting_since.size != backlogged.size:
+            self.waiting_since = np.full(backlogged.size, -1)
+        if self.longest_wait is None or self.longest_wait.size != backlogged.size:
+            self.longest_wait = np.zeros(backlogged.size, dtype=np.int64)
+        
+        # Cohort rows are not UEs
+        served = [row for row in self._served if row < backlogged.size]
+        self._served = []
+        self.waiting_since[served] = -1
+        self.waiting_since[~backlogged] = -1
+        self.waiting_since[backlogged & (self.waiting_since < 0)] = tti
+        self.waiting_since[served] = np.where(backlogged[served], tti + 1, -1)
+        
+        wait = np.where(self.waiting_since >= 0, tti + 1 - self.waiting_since, 0)
+        np.maximum(self.longest_wait, wait, out=self.longest_wait)
+        self.starved_ue_ttis += int(np.count_nonzero(wait > self.threshold))
+    
+    def summary(self):
+        longest = self.longest_wait if self.longest_wait is not None else np.zeros(0, dtype=np.int64)
+        return {
+            'threshold': self.threshold,
+            'starved_ues': np.flatnonzero(longest > self.threshold).tolist(),
+            'longest_wait': int(longest.max()) if longest.size else 0,
+            'starved_ue_ttis': self.starved_ue_ttis
+        }
+
+
+class DropObserver(Observer):
+    """Dropped packets per traffic class, split into buffer overflow and expiry"""
+    name = 'drops'
+    
+    def __init__(self):
+        self.drops = {'arrivals': {}, 'expiry': {}}
+    
+    def on_reset_statistics(self, sim):
+        self.drops = {'arrivals': {}, 'expiry': {}}
+    
+    def on_drop(self, sim, tti, phase, drops):
+        counts = self.drops[phase]
+        for traffic_type, packets in drops.items():
+            counts[traffic_type] = counts.get(traffic_type, 0) + packets
+    
+    def summary(self):
+        return {'overflow': dict(self.drops['arrivals']), 'expired': dict(self.drops['expiry'])}
+
+
+OBSERVERS = {
+    'profile': ProfileObserver,
+    'starvation': StarvationObserver,
+    'drops': DropObserver
+}
+
+
+def build_observers(names, config=None):
+    """Built-in observers by name, with their parameters from config"""
+    config = config or Config()
+    unknown = set(names) - set(OBSERVERS)
+    if unknown:
+        raise ValueError(f"Unknown observers {sorted(unknown)}; expected some of {sorted(OBSERVERS)}")
+    params = {
+        'profile': {'sample_every': config.PROFILE_SAMPLE_EVERY},
+        'starvation': {'threshold': config.STARVATION_TTIS}
+    }
+    return [OBSERVERS[name](**params.get(name, {})) for name in names]
@@ -0,0 +1,113 @@
+"""
+Columnar per-TTI time-series recorder for 5G NR simulation
+"""
+import glob
+import json
+import os
+import numpy as np
+from config import RECORD_BLOCK_SIZE
+
+
+# Column name -> (dtype, per-UE?)
+COLUMNS = {
+    'tti': (np.int64, False),
+    'selected': (np.int32, False),  # Scheduled UE (most bytes if several), -1 if none
+    'bytes_sent': (np.int32, True),
+    'hol_delay': (np.int32, True),
+    'buffer_size': (np.int32, True),
+    'cqi': (np.int8, True)
+}
+
+
+class TimeSeriesRecorder:
+    """Writes per-TTI, per-UE series to a directory of compressed .npz chunks.
+    
+    Rows are written into preallocated blocks of block_size TTIs; a full
+    block is flushed as one chunk holding every column as its own array,
+    so the hot loop only copies one row per column per TTI.
+    """
+    def __init__(self, directory, num_ues, block_size=RECORD_BLOCK_SIZE):
+        self.directory = directory
+        self.num_ues = num_ues
+        self.block_size = block_size
+        self.blocks = {}
+        for name, (dtype, per_ue) in COLUMNS.items():
+            shape = (block_size, num_ues) if per_ue else (block_size,)
+            self.blocks[name] = np.zeros(shape, dtype=dtype)
+        self.filled = 0
+        self.num_chunks = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'num_ues': num_ues, 'columns': list(COLUMNS)}, f)
+    
+    def record(self, tti, selected, bytes_sent, hol_delay, buffer_size, cqi):
+        """Append the row of one TTI (per-UE arguments are length-num_ues sequences)"""
+        row = self.filled
+        blocks = self.blocks
+        blocks['tti'][row] = tti
+        blocks['selected'][row] = selected
+        blocks['bytes_sent'][row] = bytes_sent
+        blocks['hol_delay'][row] = hol_delay
+        blocks['buffer_size'][row] = buffer_size
+        blocks['cqi'][row] = cqi
+        self.filled += 1
+        if self.filled == self.block_size:
+            self.flush()
+    
+    def record_many(self, tti, selected, bytes_sent, hol_delay, buffer_size, cqi):
+        """Append consecutive rows at once (per-UE arguments are (rows, num_ues) arrays)"""
+        columns = {'tti': tti, 'selected': selected, 'bytes_sent': bytes_sent,
+                   'hol_delay': hol_delay, 'buffer_size': buffer_size, 'cqi': cqi}
+        done = 0
+        while done < len(tti):
+            take = min(len(tti) - done, self.block_size - self.filled)
+            for name, values in columns.items():
+                self.blocks[name][self.filled:self.filled + take] = values[done:done + take]
+            self.filled += take
+            done += take
+            if self.filled == self.block_size:
+                self.flush()
+    
+    def flush(self):
+        """Write the filled part of the current block as the next chunk"""
+        if self.filled == 0:
+            return
+        path = os.path.join(self.directory, f'chunk_{self.num_chunks:06d}.npz')
+        np.savez_compressed(path, **{name: block[:self.filled] for name, block in self.blocks.items()})
+        self.num_chunks += 1
+        self.filled = 0
+    
+    def close(self):
+        """Flush any remaining rows"""
+        self.flush()
+    
+    def __getstate__(self):
+        # Checkpoint only the filled rows of the current block
+        state = self.__dict__.copy()
+        state['blocks'] = {name: block[:self.filled].copy() for name, block in self.blocks.items()}
+        return state
+    
+    def __setstate__(self, state):
+        blocks = state.pop('blocks')
+        self.__dict__.update(state)
+        self.blocks = {}
+        for name, (dtype, per_ue) in COLUMNS.items():
+            shape = (self.block_size, self.num_ues) if per_ue else (self.block_size,)
+            self.blocks[name] = np.zeros(shape, dtype=dtype)
+            self.blocks[name][:self.filled] = blocks[name]
+
+
+def iter_recording(directory, columns=None):
+    """Yield dicts of column arrays, one per chunk, in TTI order"""
+    for path in sorted(glob.glob(os.path.join(directory, 'chunk_*.npz'))):
+        with np.load(path) as chunk:
+            yield {name: chunk[name] for name in (columns or chunk.files)}
+
+
+def load_recording(directory, columns=None):
+    """Load whole columns of a recording (concatenated over all chunks)"""
+    chunks = list(iter_recording(directory, columns))
+    if not chunks:
+        return {}
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
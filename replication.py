@@ -0,0 +1,131 @@
+"""
+Adaptive Monte Carlo replication with confidence-interval early stopping
+"""
+import math
+import os
+from statistics import NormalDist
+from runner import (run_jobs, run_name, run_options, warm_up_job, aggregate_metrics,
+                    SUMMARY_METRICS)
+from stats import RunningStats
+from config import (Config, RANDOM_SEED, CI_RELATIVE_WIDTH, CI_CONFIDENCE, MIN_REPLICAS,
+                    MAX_REPLICAS)
+
+
+def t_cdf(t, dof):
+    """Student t CDF for integer dof (exact finite series, Abramowitz & Stegun 26.7.3-4)"""
+    theta = math.atan(t / math.sqrt(dof))
+    c2 = math.cos(theta) ** 2
+    series = term = 1.0
+    if dof % 2:
+        for j in range(1, (dof - 1) // 2):
+            term *= 2 * j / (2 * j + 1) * c2
+            series += term
+        a = 2 / math.pi * (theta + (math.sin(theta) * math.cos(theta) * series if dof > 1 else 0))
+    else:
+        for j in range(1, dof // 2):
+            term *= (2 * j - 1) / (2 * j) * c2
+            series += term
+        a = math.sin(theta) * series
+    return (1 + a) / 2
+
+
+def t_pdf(t, dof):
+    log_norm = math.lgamma((dof + 1) / 2) - math.lgamma(dof / 2) - 0.5 * math.log(dof * math.pi)
+    return math.exp(log_norm - (dof + 1) / 2 * math.log1p(t * t / dof))
+
+
+def t_quantile(p, dof):
+    """Student t quantile for integer dof.
+    
+    The Cornish-Fisher expansion around the normal quantile is refined by
+    Newton steps on the exact CDF; alone it is too small at low dof (9.71
+    instead of 12.71 for p=0.975, dof=1), which narrows the CIs and stops
+    replication early.
+    """
+    z = NormalDist().inv_cdf(p)
+    if dof == math.inf:
+        return z
+    t = (z + (z**3 + z) / (4 * dof)
+         + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * dof**2)
+         + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * dof**3))
+    for _ in range(100):
+        step = (p - t_cdf(t, dof)) / t_pdf(t, dof)
+        t += step
+        if abs(step) <= 1e-12 * abs(t):
+            break
+    return t
+
+
+def confidence_interval(stats, confidence=CI_CONFIDENCE):
+    """(low, high) t-interval for the mean of a RunningStats sample"""
+    if stats.count < 2:
+        return (-math.inf, math.inf)
+    half_width = t_quantile(0.5 + confidence / 2, stats.count - 1) * stats.std / math.sqrt(stats.count)
+    return (stats.mean - half_width, stats.mean + half_width)
+
+
+def is_precise(stats, rel_width=CI_RELATIVE_WIDTH, confidence=CI_CONFIDENCE):
+    """Whether the CI width is within rel_width of the mean (a constant sample always is)"""
+    if stats.count < 2:
+        return False
+    if stats.std == 0:
+        return True
+    low, high = confidence_interval(stats, confidence)
+    return high - low <= rel_width * abs(stats.mean)
+
+
+def replicate(scheduler_names, options=None, rel_width=CI_RELATIVE_WIDTH,
+              confidence=CI_CONFIDENCE, min_replicas=MIN_REPLICAS,
+              max_replicas=MAX_REPLICAS, max_workers=None, first_seed=RANDOM_SEED,
+              warmup_time=None):
+    """Run independent replicas of every scheduler until all summary CIs are narrow enough.
+    
+    Replicas are launched in rounds sized to the worker pool; a scheduler
+    stops receiving replicas once the CI of every SUMMARY_METRICS entry is
+    within rel_width of its mean, or after max_replicas. Replica k of every
+    scheduler uses seed first_seed + k. As in run_parallel, every seed is
+    warmed up once for warmup_time TTIs (None: the config's WARMUP_TIME) and
+    all its replicas continue from that snapshot. Returns aggregated
+    per-scheduler metrics with the CIs under 'ci'.
+    """
+    options = options or {}
+    max_workers = max_workers or os.cpu_count() or 1
+    if warmup_time is None:
+        warmup_time = (options.get('config') or Config()).WARMUP_TIME
+    snapshots = {}  # Warm-up snapshot by seed
+    runs = {name: [] for name in scheduler_names}
+    stats = {name: {key: RunningStats() for key in SUMMARY_METRICS} for name in scheduler_names}
+    
+    pending = list(scheduler_names)
+    while pending:
+        # Spread one round over the pool, at least min_replicas in total per scheduler
+        per_scheduler = max(1, max_workers // len(pending))
+        jobs = []
+        for name in pending:
+            done = len(runs[name])
+            batch = max(per_scheduler, min_replicas - done)
+            batch = min(batch, max_replicas - done)
+            jobs += [(name, first_seed + k, run_options(options, run_name(name, first_seed + k)),
+                      first_seed + k if warmup_time else None)
+                     for k in range(done, done + batch)]
+        
+        if warmup_time:
+            seeds = sorted({seed for _, seed, _, _ in jobs} - snapshots.keys())
+            warm_up_jobs = [(seed, options, warmup_time) for seed in seeds]
+            snapshots.update(zip(seeds, run_jobs(warm_up_jobs, max_workers, function=warm_up_job)))
+        
+        for (name, _, _, _), metrics in zip(jobs, run_jobs(jobs, max_workers, snapshots)):
+            runs[name].append(metrics)
+            for key in SUMMARY_METRICS:
+                stats[name][key].add(metrics[key])
+        
+        pending = [name for name in pending
+                   if len(runs[name]) < max_replicas
+                   and not all(is_precise(s, rel_width, confidence) for s in stats[name].values())]
+    
+    results = []
+    for name in scheduler_names:
+        result = aggregate_metrics(runs[name])
+        result['ci'] = {key: confidence_interval(s, confidence) for key, s in stats[name].items()}
+        results.append(result)
+    return results
@@ -0,0 +1,204 @@
+"""
+Parallel multi-scheduler, multi-seed simulation runner
+"""
+import copy
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from simulator import Simulator
+from schedulers import SCHEDULERS
+from recorder import TimeSeriesRecorder
+import checkpoint
+from config import Config
+
+
+SUMMARY_METRICS = ['avg_throughput', 'avg_delay', 'packet_loss_ratio', 'fairness_index']
+
+# Warm-up snapshots by key; forked workers inherit them copy-on-write
+_snapshots = {}
+
+
+def run_name(scheduler_name, seed, prefix=''):
+    """Name of one run of a multi-run driver, used for its output paths"""
+    return f"{prefix}{scheduler_name.replace(' ', '_')}_seed{seed}"
+
+
+def run_options(options, name):
+    """Simulator options with the recording directory and checkpoint file of one run of many.
+    
+    A RECORD_DIR or checkpoint path shared by every run would be
+    overwritten run after run, so each run records into its own name
+    subdirectory and checkpoints to the path with -name before the extension.
+    """
+    if options.get('recorder') is not None:
+        raise ValueError("Multi-run drivers take RECORD_DIR from the config, not a shared recorder")
+    options = dict(options)
+    config = options.get('config') or Config()
+    changes = {}
+    if config.RECORD_DIR:
+        changes['RECORD_DIR'] = os.path.join(config.RECORD_DIR, name)
+    if config.CHECKPOINT_PATH:
+        changes['CHECKPOINT_PATH'] = _run_path(config.CHECKPOINT_PATH, name)
+    if changes:
+        options['config'] = config.replace(**changes)
+    if options.get('checkpoint_path'):
+        options['checkpoint_path'] = _run_path(options['checkpoint_path'], name)
+    return options
+
+
+def _run_path(path, name):
+    root, ext = os.path.splitext(path)
+    return f"{root}-{name}{ext}"
+
+
+def warm_up(seed, options, warmup_time):
+    """Simulate warmup_time TTIs under the config's WARMUP_SCHEDULER; snapshot with statistics reset.
+    
+    The shared warm-up is neither recorded nor checkpointed; every run
+    continuing from the snapshot opens its own outputs.
+    """
+    options = {name: value for name, value in options.items()
+               if name not in ('recorder', 'checkpoint_every', 'checkpoint_path')}
+    options['config'] = (options.get('config') or Config()).replace(
+        RECORD_DIR=None, CHECKPOINT_EVERY=None, CHECKPOINT_PATH=None)
+    scheduler = SCHEDULERS[options['config'].WARMUP_SCHEDULER](options['config'])
+    sim = Simulator(scheduler, rng=np.random.default_rng(seed), **options)
+    sim.advance(warmup_time)
+    sim.reset_statistics()
+    return checkpoint.dumps(sim)
+
+
+def run_job(job):
+    """Run one (scheduler name, seed, simulator options, snapshot key) job.
+    
+    Without a snapshot the run starts cold with its own Generator; with one
+    it continues from the shared warm-up state, random stream included.
+    """
+    scheduler_name, seed, options, snapshot = job
+    scheduler = SCHEDULERS[scheduler_name](options.get('config'))
+    if snapshot is None:
+        sim = Simulator(scheduler, rng=np.random.default_rng(seed), **options)
+    else:
+        sim = checkpoint.loads(_snapshots[snapshot])
+        sim.scheduler = scheduler
+        config = options.get('config') or Config()
+        if config.RECORD_DIR:
+            sim.recorder = TimeSeriesRecorder(config.RECORD_DIR, config.NUM_UES,
+                                              config.RECORD_BLOCK_SIZE)
+        sim.checkpoint_every = options.get('checkpoint_every') or config.CHECKPOINT_EVERY
+        sim.checkpoint_path = options.get('checkpoint_path') or config.CHECKPOINT_PATH
+    return sim.run()
+
+
+def _set_snapshots(snapshots):
+    """Worker initializer where snapshots cannot be inherited through fork"""
+    _snapshots.update(snapshots)
+
+
+def warm_up_job(job):
+    """warm_up for one (seed, simulator options, warmup_time) job"""
+    return warm_up(*job)
+
+
+def run_jobs(jobs, max_workers=None, snapshots=None, function=run_job):
+    """Run jobs across a process pool, returning the results of function in job order"""
+    _snapshots.clear()
+    _snapshots.update(snapshots or {})
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(jobs) == 1:
+        return [function(job) for job in jobs]
+    
+    chunksize = max(1, len(jobs) // (max_workers * 4))
+    if 'fork' in multiprocessing.get_all_start_methods():
+        pool = ProcessPoolExecutor(max_workers=max_workers,
+                                   mp_context=multiprocessing.get_context('fork'))
+    else:
+        pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_set_snapshots,
+                                   initargs=(_snapshots,))
+    with pool:
+        return list(pool.map(function, jobs, chunksize=chunksize))
+
+
+def aggregate_metrics(runs):
+    """Average the metrics dicts of several runs of one scheduler.
+    
+    Scalar metrics are averaged and per-UE lists averaged element-wise, so
+    the result has the same layout as Simulator.collect_metrics and can be
+    passed to Visualizer. The spread of the summary metrics is kept under 'std'.
+    """
+    aggregated = {'scheduler': runs[0]['scheduler'], 'num_runs': len(runs)}
+    for key in runs[0]:
+        if key not in ('scheduler', 'sketches', 'observers'):
+            aggregated[key] = _average([run[key] for run in runs])
+    # Observer reports are diagnostics of individual runs
+    if 'observers' in runs[0]:
+        aggregated['observers'] = [run['observers'] for run in runs]
+    
+    # Tail statistics come from the merged sketches, not averaged percentiles
+    if 'sketches' in runs[0]:
+        merged = copy.deepcopy(runs[0]['sketches'])
+        for run in runs[1:]:
+            merged.merge(run['sketches'])
+        aggregated.update(merged.summary())
+        aggregated['sketches'] = merged
+    aggregated['std'] = {key: float(np.std([run[key] for run in runs])) for key in SUMMARY_METRICS}
+    return aggregated
+
+
+def _average(values):
+    """Mean of scalars, element-wise mean of lists, key-wise mean of dicts"""
+    if isinstance(values[0], dict):
+        return {key: _average([value[key] for value in values]) for key in values[0]}
+    if isinstance(values[0], list):
+        return np.mean(np.array(values, dtype=float), axis=0).tolist()
+    return float(np.mean(values))
+
+
+def run_parallel(scheduler_names, seeds, configs, max_workers=None, warmup_time=None):
+    """Run every (config, scheduler, seed) combination in parallel.
+    
+    Each config is a dict of Simulator keyword options (a Config object goes
+    under 'config' and is shared with the schedulers). All schedulers of a
+    given seed see identical channel and traffic realisations. With a
+    warmup_time, each (config, seed) is warmed up once and every scheduler
+    continues from that snapshot, measuring only the remaining TTIs; None
+    takes WARMUP_TIME from each config.
+    Returns one list of aggregated per-scheduler metrics for each config.
+    """
+    warmup_times = [warmup_time if warmup_time is not None
+                    else (options.get('config') or Config()).WARMUP_TIME for options in configs]
+    
+    # Warm-ups run as pool jobs too; their snapshots reach the scheduler
+    # jobs' pool by fork (or its initializer)
+    keys = [(c, seed) for c in range(len(configs)) if warmup_times[c] for seed in seeds]
+    warm_up_jobs = [(seed, configs[c], warmup_times[c]) for c, seed in keys]
+    snapshots = {}
+    if keys:
+        snapshots = dict(zip(keys, run_jobs(warm_up_jobs, max_workers, function=warm_up_job)))
+    
+    # Runs of several configs are told apart by config index in their output paths
+    prefixes = [f"config{c}_" if len(configs) > 1 else '' for c in range(len(configs))]
+    jobs = [(name, seed, run_options(options, run_name(name, seed, prefixes[c])),
+             (c, seed) if warmup_times[c] else None)
+            for c, options in enumerate(configs)
+            for name in scheduler_names
+            for seed in seeds]
+    runs = run_jobs(jobs, max_workers, snapshots)
+    
+    results = []
+    num_seeds = len(seeds)
+    for c in range(len(configs)):
+        per_scheduler = []
+        for s in range(len(scheduler_names)):
+            start = (c * len(scheduler_names) + s) * num_seeds
+            per_scheduler.append(aggregate_metrics(runs[start:start + num_seeds]))
+        results.append(per_scheduler)
+    return results
+
+
+def compare_schedulers(scheduler_names, seeds, options=None, max_workers=None,
+                       warmup_time=None):
+    """Aggregated per-scheduler metrics for one simulator configuration"""
+    return run_parallel(scheduler_names, seeds, [options or {}], max_workers, warmup_time)[0]
@@ -2,196 +2,313 @@
 Scheduling algorithms for 5G NR downlink
 """
 import numpy as np
-from config import ALPHA, BETA, GAMMA, MAX_BUFFER_SIZE
+from config import Config
+
+
+# Approximate mapping: CQI 1-15 to data rates (bytes/TTI)
+RATE_TABLE = np.array([
+    0, 150, 300, 450, 600, 800, 1000, 1200,
+    1400, 1600, 1800, 2000, 2200, 2400, 2600, 2800
+])
+RATE_LIST = tuple(RATE_TABLE.tolist())  # Same table for fast scalar lookups
+
+
+class SchedulingState:
+    """Scheduler inputs for a set of UEs as parallel NumPy arrays"""
+    def __init__(self, ue_ids, cqi, avg_throughput, hol_delay, delay_threshold,
+                 priority, buffer_size, backlogged):
+        self.ue_ids = ue_ids
+        self.cqi = cqi
+        self.avg_throughput = avg_throughput
+        self.hol_delay = hol_delay
+        self.delay_threshold = delay_threshold
+        self.priority = priority
+        self.buffer_size = buffer_size
+        self.backlogged = backlogged
+    
+    @classmethod
+    def from_ues(cls, ues, current_time):
+        """Gather the state of a list of UserEquipment objects"""
+        return cls(
+            ue_ids=np.array([ue.ue_id for ue in ues]),
+            cqi=np.array([ue.cqi for ue in ues]),
+            avg_throughput=np.array([ue.avg_throughput for ue in ues], dtype=float),
+            hol_delay=np.array([ue.get_head_of_line_delay(current_time) for ue in ues]),
+            delay_threshold=np.array([ue.delay_threshold for ue in ues]),
+            priority=np.array([ue.priority for ue in ues]),
+            buffer_size=np.array([ue.buffer_size for ue in ues]),
+            backlogged=np.array([bool(ue.buffer) for ue in ues], dtype=bool)
+        )
+    
+    @classmethod
+    def concatenate(cls, states):
+        """One state holding the UEs of several states back to back"""
+        return cls(**{name: np.concatenate([getattr(s, name) for s in states])
+                      for name in vars(states[0])})
+    
+    def __len__(self):
+        return len(self.ue_ids)
+    
+    def per_rb(self, rb_cqi):
+        """State with a UE x RB CQI matrix; per-UE fields become columns that broadcast"""
+        return SchedulingState(
+            ue_ids=self.ue_ids,
+            cqi=rb_cqi,
+            avg_throughput=self.avg_throughput[:, None],
+            hol_delay=self.hol_delay[:, None],
+            delay_threshold=self.delay_threshold[:, None],
+            priority=self.priority[:, None],
+            buffer_size=self.buffer_size[:, None],
+            backlogged=self.backlogged[:, None]
+        )
+
+
+def masked_argmax(metric, mask):
+    """Index of the first maximum of metric among masked entries, or None"""
+    if not mask.any():
+        return None
+    return int(np.argmax(np.where(mask, metric, -np.inf)))
+
+
+def segmented_argmax(metric, lengths):
+    """First argmax (offset within its segment) of every consecutive segment, None if all -inf"""
+    result = [None] * len(lengths)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    nonempty = np.flatnonzero(lengths)
+    if nonempty.size == 0:
+        return result
+    maxima = np.maximum.reduceat(metric, starts[nonempty])
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    hits = np.flatnonzero(metric == maxima[np.searchsorted(nonempty, segment)])
+    first_segments, first = np.unique(segment[hits], return_index=True)
+    for seg, idx in zip(first_segments.tolist(), hits[first].tolist()):
+        if maxima[np.searchsorted(nonempty, seg)] > -np.inf:
+            result[seg] = idx - int(starts[seg])
+    return result
 
 
 class Scheduler:
-    def __init__(self, name):
+    # Whether metric() depends only on each UE's own fields, so the states
+    # of independent cells can be evaluated as one concatenated state
+    elementwise_metric = False
+    
+    def __init__(self, name, config=None):
         self.name = name
+        self.config = config or Config()
     
     def select_ue(self, ues, current_time):
-        """Select UE for transmission - to be overridden"""
+        """Select UE for transmission from a list of UE objects"""
+        idx = self.select_index(SchedulingState.from_ues(ues, current_time))
+        return ues[idx] if idx is not None else None
+    
+    def select_index(self, state):
+        """Select index into a SchedulingState; highest metric among backlogged UEs"""
+        return masked_argmax(self.metric(state), state.backlogged)
+    
+    def select_indices(self, states):
+        """select_index for several independent states (e.g. one per cell) in one evaluation"""
+        if not self.elementwise_metric or len(states) == 1:
+            return [self.select_index(state) for state in states]
+        merged = SchedulingState.concatenate(states)
+        metric = np.where(merged.backlogged, self.metric(merged), -np.inf)
+        return segmented_argmax(metric, np.array([len(state) for state in states]))
+    
+    def allocate_rbs(self, state):
+        """Assign every RB to a UE given a per_rb() state; returns UE index per RB or None.
+        
+        Each RB goes to the backlogged UE with the highest metric on that RB.
+        """
+        if not state.backlogged.any():
+            return None
+        metric = np.where(state.backlogged, self.metric(state), -np.inf)
+        return np.argmax(metric, axis=0)
+    
+    def metric(self, state):
+        """Per-UE (or per-UE, per-RB) scheduling metric array - to be overridden"""
         raise NotImplementedError
     
+    def plan_window(self, state, cqi_window, packet_size, arrivals_window):
+        """Plan the next K TTIs from state and K x len(state) CQI and arrival windows.
+        
+        Returns the planned index into state for every TTI (-1 for idle).
+        state already holds the first TTI's arrivals. The window is played
+        forward like the per-TTI loop: later arrivals join the buffers up to
+        MAX_BUFFER_SIZE, the planned UE sends the whole packets its CQI rate
+        fits, as UEPopulation.transmit does, and its average throughput is
+        updated. Expiry is not modelled, and a head-of-line delay only
+        restarts when an empty buffer gets an arrival, so with a window of
+        K > 1 delay-aware metrics (M-LWDF, EXP, Hybrid) can decide
+        differently from per-TTI scheduling. Subclasses may override this to
+        use the future CQI (lookahead scheduling).
+        """
+        plan = np.full(len(cqi_window), -1, dtype=np.int64)
+        buffer_size = state.buffer_size.copy()
+        avg_throughput = np.array(state.avg_throughput, dtype=float)
+        head_time = -np.asarray(state.hol_delay)  # Window step the head packet arrived in
+        rates = RATE_TABLE[cqi_window]
+        for k, cqi in enumerate(cqi_window):
+            if k:
+                space = (self.config.MAX_BUFFER_SIZE - buffer_size) // packet_size
+                head_time = np.where(buffer_size > 0, head_time, k)
+                buffer_size += np.minimum(arrivals_window[k], space) * packet_size
+            step = SchedulingState(state.ue_ids, cqi, avg_throughput, k - head_time,
+                                   state.delay_threshold, state.priority, buffer_size,
+                                   buffer_size > 0)
+            idx = self.select_index(step)
+            if idx is None:
+                continue
+            plan[k] = idx
+            sent = min(buffer_size[idx], rates[k, idx] // packet_size[idx] * packet_size[idx])
+            buffer_size[idx] -= sent
+            avg_throughput[idx] = 0.9 * avg_throughput[idx] + 0.1 * sent
+        return plan
+    
     def get_data_rate(self, cqi):
         """Map CQI to data rate (simplified model)"""
-        # Approximate mapping: CQI 1-15 to data rates
-        rate_table = [
-            0, 150, 300, 450, 600, 800, 1000, 1200,
-            1400, 1600, 1800, 2000, 2200, 2400, 2600, 2800
-        ]
-        return rate_table[cqi]
+        return RATE_LIST[cqi]
+    
+    def get_rb_data_rates(self, rb_cqi, allocation):
+        """Per-UE data rate from an RB allocation; each RB carries 1/NUM_RBS of its CQI rate"""
+        num_ues, num_rbs = rb_cqi.shape
+        rb_rates = RATE_TABLE[rb_cqi[allocation, np.arange(num_rbs)]] / num_rbs
+        return np.bincount(allocation, weights=rb_rates, minlength=num_ues).astype(np.int64)
 
 
 class RoundRobinScheduler(Scheduler):
-    def __init__(self):
-        super().__init__("Round Robin")
+    def __init__(self, config=None):
+        super().__init__("Round Robin", config)
         self.last_scheduled = -1
     
-    def select_ue(self, ues, current_time):
+    def select_index(self, state):
         """Cyclic selection of UEs"""
-        num_ues = len(ues)
-        for i in range(num_ues):
-            idx = (self.last_scheduled + 1 + i) % num_ues
-            if ues[idx].buffer:
-                self.last_scheduled = idx
-                return ues[idx]
-        return None
+        candidates = np.flatnonzero(state.backlogged)
+        if candidates.size == 0:
+            return None
+        
+        # First backlogged UE after the last scheduled one, wrapping around
+        after = candidates[state.ue_ids[candidates] > self.last_scheduled]
+        idx = int(after[0]) if after.size else int(candidates[0])
+        self.last_scheduled = int(state.ue_ids[idx])
+        return idx
+    
+    def allocate_rbs(self, state):
+        """Deal RBs cyclically to backlogged UEs, continuing after the last scheduled one"""
+        candidates = np.flatnonzero(state.backlogged)
+        if candidates.size == 0:
+            return None
+        
+        start = np.searchsorted(state.ue_ids[candidates], self.last_scheduled, side='right')
+        order = np.roll(candidates, -start)
+        allocation = order[np.arange(state.cqi.shape[1]) % order.size]
+        self.last_scheduled = int(state.ue_ids[allocation[-1]])
+        return allocation
 
 
 class ProportionalFairScheduler(Scheduler):
-    def __init__(self):
-        super().__init__("Proportional Fair")
+    elementwise_metric = True
     
-    def select_ue(self, ues, current_time):
-        """Select UE based on CQI/avg_throughput ratio"""
-        best_ue = None
-        best_metric = -1
-        
-        for ue in ues:
-            if ue.buffer:
-                metric = ue.cqi / max(ue.avg_throughput, 0.001)
-                if metric > best_metric:
-                    best_metric = metric
-                    best_ue = ue
-        
-        return best_ue
+    def __init__(self, config=None):
+        super().__init__("Proportional Fair", config)
+    
+    def metric(self, state):
+        """CQI/avg_throughput ratio"""
+        return state.cqi / np.maximum(state.avg_throughput, 0.001)
 
 
 class MLWDFScheduler(Scheduler):
     """Modified Largest Weighted Delay First - Industry standard QoS scheduler"""
-    def __init__(self):
-        super().__init__("M-LWDF")
+    elementwise_metric = True
     
-    def select_ue(self, ues, current_time):
-        """Select UE using M-LWDF metric: priority * delay_ratio * channel_ratio"""
-        best_ue = None
-        best_metric = -1
+    def __init__(self, config=None):
+        super().__init__("M-LWDF", config)
+    
+    def metric(self, state):
+        """M-LWDF metric: priority * delay_ratio * channel_ratio"""
+        # Delay ratio: current delay / delay threshold
+        delay_ratio = state.hol_delay / state.delay_threshold
         
-        for ue in ues:
-            if ue.buffer:
-                # Delay ratio: current delay / delay threshold
-                delay = ue.get_head_of_line_delay(current_time)
-                delay_ratio = delay / ue.delay_threshold
-                
-                # Channel-aware component (PF-like)
-                channel_ratio = ue.cqi / max(ue.avg_throughput, 0.001)
-                
-                # Priority weight
-                priority_weight = ue.priority
-                
-                # M-LWDF metric: combines all factors multiplicatively
-                metric = priority_weight * delay_ratio * channel_ratio
-                
-                if metric > best_metric:
-                    best_metric = metric
-                    best_ue = ue
+        # Channel-aware component (PF-like)
+        channel_ratio = state.cqi / np.maximum(state.avg_throughput, 0.001)
         
-        return best_ue
+        # M-LWDF metric: combines all factors multiplicatively
+        return state.priority * delay_ratio * channel_ratio
 
 
 class HybridAdaptiveScheduler(Scheduler):
     """Advanced hybrid scheduler with dynamic mode switching"""
-    def __init__(self):
-        super().__init__("Hybrid Adaptive")
+    def __init__(self, config=None):
+        super().__init__("Hybrid Adaptive", config)
         self.urgency_threshold = 0.6  # Switch to urgency mode at 60% of delay threshold
     
-    def select_ue(self, ues, current_time):
+    def metric(self, state):
         """Hybrid approach: urgency-first for critical packets, then optimized selection"""
         # Phase 1: Check for urgent packets (URLLC or near-deadline)
-        urgent_ue = self._select_urgent_ue(ues, current_time)
-        if urgent_ue:
-            return urgent_ue
+        urgency_ratio = state.hol_delay / state.delay_threshold
+        urgent = state.backlogged & (urgency_ratio > self.urgency_threshold)
+        if urgent.any():
+            return np.where(urgent, self._urgency_score(state, urgency_ratio), -np.inf)
         
         # Phase 2: Optimized selection for non-urgent traffic
-        return self._select_optimized_ue(ues, current_time)
+        return self._optimized_metric(state)
     
-    def _select_urgent_ue(self, ues, current_time):
-        """Select UE with urgent packets exceeding threshold"""
-        best_ue = None
-        best_urgency = -1
-        
-        for ue in ues:
-            if ue.buffer:
-                delay = ue.get_head_of_line_delay(current_time)
-                urgency_ratio = delay / ue.delay_threshold
-                
-                # Prioritize packets approaching deadline
-                if urgency_ratio > self.urgency_threshold:
-                    # Urgency score: higher for URLLC and closer to deadline
-                    urgency_score = (urgency_ratio ** 2) * ue.priority * ue.cqi
-                    
-                    if urgency_score > best_urgency:
-                        best_urgency = urgency_score
-                        best_ue = ue
-        
-        return best_ue
+    def _urgency_score(self, state, urgency_ratio):
+        """Urgency score: higher for URLLC and closer to deadline"""
+        return (urgency_ratio ** 2) * state.priority * state.cqi
     
-    def _select_optimized_ue(self, ues, current_time):
-        """Optimized selection balancing throughput, fairness, and QoS"""
-        best_ue = None
-        best_metric = -1
+    def _optimized_metric(self, state):
+        """Optimized metric balancing throughput, fairness, and QoS"""
+        if not state.backlogged.any():
+            return np.full(np.shape(state.cqi), -np.inf)
         
         # Calculate system-wide statistics for normalization
-        avg_system_throughput = np.mean([ue.avg_throughput for ue in ues if ue.buffer]) or 1
+        avg_system_throughput = np.mean(state.avg_throughput[state.backlogged]) or 1
+        avg_throughput = np.maximum(state.avg_throughput, 0.001)
+        
+        # Component 1: Channel efficiency (instantaneous rate / average rate)
+        instantaneous_rate = RATE_TABLE[state.cqi]
+        channel_efficiency = instantaneous_rate / avg_throughput
+        
+        # Component 2: Fairness factor (penalize high-throughput users)
+        fairness_factor = avg_system_throughput / avg_throughput
         
-        for ue in ues:
-            if ue.buffer:
-                # Component 1: Channel efficiency (instantaneous rate / average rate)
-                instantaneous_rate = self.get_data_rate(ue.cqi)
-                channel_efficiency = instantaneous_rate / max(ue.avg_throughput, 0.001)
-                
-                # Component 2: Fairness factor (penalize high-throughput users)
-                fairness_factor = avg_system_throughput / max(ue.avg_throughput, 0.001)
-                
-                # Component 3: QoS factor (delay-based with priority)
-                delay = ue.get_head_of_line_delay(current_time)
-                qos_factor = (1 + delay / ue.delay_threshold) * (ue.priority ** 1.5)
-                
-                # Component 4: Buffer occupancy (prioritize fuller buffers more aggressively)
-                buffer_ratio = ue.buffer_size / MAX_BUFFER_SIZE
-                buffer_factor = 1 + buffer_ratio * 0.8
-                
-                # Combined metric with adaptive weights
-                metric = (channel_efficiency ** 0.35) * (fairness_factor ** 0.25) * \
-                         (qos_factor ** 0.25) * (buffer_factor ** 0.15)
-                
-                if metric > best_metric:
-                    best_metric = metric
-                    best_ue = ue
+        # Component 3: QoS factor (delay-based with priority)
+        qos_factor = (1 + state.hol_delay / state.delay_threshold) * (state.priority ** 1.5)
         
-        return best_ue
+        # Component 4: Buffer occupancy (prioritize fuller buffers more aggressively)
+        buffer_ratio = state.buffer_size / self.config.MAX_BUFFER_SIZE
+        buffer_factor = 1 + buffer_ratio * 0.8
+        
+        # Combined metric with adaptive weights
+        return (channel_efficiency ** 0.35) * (fairness_factor ** 0.25) * \
+               (qos_factor ** 0.25) * (buffer_factor ** 0.15)
 
 
 class EXPRuleScheduler(Scheduler):
     """EXP Rule scheduler - Exponential rule for delay-sensitive traffic"""
-    def __init__(self):
-        super().__init__("EXP Rule")
+    elementwise_metric = True
+    
+    def __init__(self, config=None):
+        super().__init__("EXP Rule", config)
         self.tau = 10  # Time constant for exponential function
     
-    def select_ue(self, ues, current_time):
-        """Select UE using exponential rule metric"""
-        best_ue = None
-        best_metric = -1
+    def metric(self, state):
+        """Exponential rule metric"""
+        # Delay component with exponential growth
+        delay_ratio = state.hol_delay / state.delay_threshold
+        exp_delay = np.exp(delay_ratio / self.tau)
         
-        for ue in ues:
-            if ue.buffer:
-                # Delay component with exponential growth
-                delay = ue.get_head_of_line_delay(current_time)
-                delay_ratio = delay / ue.delay_threshold
-                exp_delay = np.exp(delay_ratio / self.tau)
-                
-                # Channel-aware component
-                channel_ratio = ue.cqi / max(ue.avg_throughput, 0.001)
-                
-                # Priority weight
-                priority_weight = ue.priority
-                
-                # EXP Rule metric
-                metric = priority_weight * exp_delay * channel_ratio
-                
-                if metric > best_metric:
-                    best_metric = metric
-                    best_ue = ue
+        # Channel-aware component
+        channel_ratio = state.cqi / np.maximum(state.avg_throughput, 0.001)
         
-        return best_ue
+        # EXP Rule metric
+        return state.priority * exp_delay * channel_ratio
+
+
+# Built-in schedulers by display name (used to build schedulers in worker processes)
+SCHEDULERS = {
+    'Round Robin': RoundRobinScheduler,
+    'Proportional Fair': ProportionalFairScheduler,
+    'M-LWDF': MLWDFScheduler,
+    'EXP Rule': EXPRuleScheduler,
+    'Hybrid Adaptive': HybridAdaptiveScheduler
+}
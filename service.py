@@ -0,0 +1,403 @@
+"""
+Asyncio scheduling service with batched decisions, and a local load generator
+
+Cells send their per-TTI SchedulingState over a local socket and receive
+the index of the scheduled UE. Requests pending at the same time are
+evaluated together: schedulers with an elementwise metric score the
+concatenated states of all cells in one vectorized pass.
+
+Messages are JSON, states a raw record array of fixed layout; nothing
+received is unpickled, so clients cannot run code in the service.
+    
+    python service.py serve                        # run the service
+    python service.py load --cells 32 --ttis 500   # start it and drive it with simulated cells
+                                                   # from one load-generator process per core
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+import numpy as np
+from simulator import Simulator
+from schedulers import SCHEDULERS, SchedulingState
+from stats import Histogram
+from config import (Config, RANDOM_SEED, SERVICE_SOCKET, SERVICE_PORT, SERVICE_MAX_BATCH,
+                    SERVICE_BATCH_WINDOW)
+
+
+HEADER = struct.Struct('!II')  # Sizes of the JSON message and of the raw data after it
+UNIX_SOCKETS = hasattr(socket, 'AF_UNIX')
+# Wire layout of one SchedulingState row
+STATE_DTYPE = np.dtype([('ue_ids', '<i8'), ('cqi', '<i8'), ('avg_throughput', '<f8'),
+                        ('hol_delay', '<i8'), ('delay_threshold', '<i8'), ('priority', '<i8'),
+                        ('buffer_size', '<i8'), ('backlogged', '?')])
+
+
+def encode_state(state):
+    record = np.empty(len(state), dtype=STATE_DTYPE)
+    for name in STATE_DTYPE.names:
+        record[name] = getattr(state, name)
+    return record.tobytes()
+
+
+def decode_state(data):
+    record = np.frombuffer(data, dtype=STATE_DTYPE)
+    return SchedulingState(**{name: record[name] for name in STATE_DTYPE.names})
+
+
+def config_overrides(config):
+    """Parameters of config that differ from the defaults (None for no config)"""
+    if config is None:
+        return None
+    defaults = Config().to_dict()
+    return {name: value for name, value in config.to_dict().items() if value != defaults[name]}
+
+
+async def read_message(reader):
+    """One message: (JSON value, raw bytes)"""
+    json_size, raw_size = HEADER.unpack(await reader.readexactly(HEADER.size))
+    message = json.loads(await reader.readexactly(json_size))
+    return message, await reader.readexactly(raw_size)
+
+
+def write_message(writer, message, raw=b''):
+    payload = json.dumps(message).encode()
+    writer.write(HEADER.pack(len(payload), len(raw)) + payload + raw)
+
+
+async def open_connection(path=SERVICE_SOCKET, port=SERVICE_PORT):
+    if UNIX_SOCKETS:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection('127.0.0.1', port)
+
+
+class SchedulingService:
+    """Serves select_index requests of many cells, coalescing pending ones into batches.
+    
+    A connection starts with ['hello', scheduler name, config overrides or
+    None] and gets its own scheduler instance, so stateful schedulers keep
+    per-cell state. ['select'] followed by an encoded state is answered with
+    an index or None, ['stats'] with the service statistics.
+    """
+    def __init__(self, max_batch=SERVICE_MAX_BATCH, batch_window=SERVICE_BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.pending = None
+        self.latency = Histogram()  # ns from request received to answer written
+        self.batch_sizes = Histogram()
+        self.requests = 0
+        self.first_request = None
+        self.last_request = None
+    
+    async def start(self, path=SERVICE_SOCKET, port=SERVICE_PORT):
+        """Start listening and batching; returns the asyncio server"""
+        self.pending = asyncio.Queue()
+        asyncio.get_running_loop().create_task(self.batch_loop())
+        if UNIX_SOCKETS:
+            if os.path.exists(path):
+                os.unlink(path)
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, '127.0.0.1', port)
+    
+    async def serve(self, path=SERVICE_SOCKET, port=SERVICE_PORT):
+        server = await self.start(path, port)
+        async with server:
+            await server.serve_forever()
+    
+    async def handle(self, reader, writer):
+        """One client connection: requests are answered in order.
+        
+        A request that fails is answered with {'error': message} and ends
+        the connection.
+        """
+        scheduler = None
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    message, raw = await read_message(reader)
+                    received = time.perf_counter_ns()
+                    kind = message[0]
+                    if kind == 'hello':
+                        _, name, overrides = message
+                        if name not in SCHEDULERS:
+                            raise ValueError(f"Unknown scheduler {name!r}")
+                        scheduler = SCHEDULERS[name](Config(**overrides) if overrides is not None else None)
+                        write_message(writer, True)
+                    elif kind == 'select':
+                        if scheduler is None:
+                            raise ValueError("'select' before 'hello'")
+                        answer = loop.create_future()
+                        self.pending.put_nowait((scheduler, decode_state(raw), answer))
+                        write_message(writer, await answer)
+                        self.record(received)
+                    elif kind == 'stats':
+                        write_message(writer, self.stats())
+                    else:
+                        raise ValueError(f"Unknown request {kind!r}")
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as exc:
+                    write_message(writer, {'error': f"{type(exc).__name__}: {exc}"})
+                    await writer.drain()
+                    break
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    def record(self, received):
+        now = time.perf_counter_ns()
+        self.latency.record(now - received)
+        self.requests += 1
+        if self.first_request is None:
+            self.first_request = received
+        self.last_request = now
+    
+    async def batch_loop(self):
+        """Wait for a request, collect whatever else is pending and evaluate it all at once"""
+        while True:
+            batch = [await self.pending.get()]
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            else:
+                # Let every connection with a request already buffered enqueue it
+                await asyncio.sleep(0)
+            while len(batch) < self.max_batch and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            self.batch_sizes.record(len(batch))
+            self.evaluate(batch)
+    
+    def evaluate(self, batch):
+        """Answer a batch: one select_indices call per scheduler with an elementwise metric"""
+        groups = {}
+        for request in batch:
+            scheduler = request[0]
+            key = scheduler.name if scheduler.elementwise_metric else id(scheduler)
+            groups.setdefault(key, []).append(request)
+        for requests in groups.values():
+            self.answer(requests)
+    
+    def answer(self, requests):
+        """Answer requests sharing a scheduler; a failing request fails only its own connection"""
+        try:
+            indices = requests[0][0].select_indices([state for _, state, _ in requests])
+        except Exception as exc:
+            if len(requests) == 1:
+                requests[0][2].set_exception(exc)
+            else:
+                # Only elementwise (stateless) metrics share a group, so the
+                # requests can be retried one by one
+                for request in requests:
+                    self.answer([request])
+            return
+        for (_, _, answer), idx in zip(requests, indices):
+            answer.set_result(int(idx) if idx is not None else None)
+    
+    def stats(self):
+        """Request count, throughput, latency percentiles (us) and mean batch size"""
+        elapsed = (self.last_request - self.first_request) / 1e9 if self.requests else 0
+        return {
+            'requests': self.requests,
+            'requests_per_s': self.requests / elapsed if elapsed else 0,
+            'latency_mean_us': self.latency.mean / 1e3,
+            'latency_p50_us': self.latency.percentile(50) / 1e3,
+            'latency_p99_us': self.latency.percentile(99) / 1e3,
+            'latency_p999_us': self.latency.percentile(99.9) / 1e3,
+            'latency_max_us': self.latency.max / 1e3,
+            'batches': self.batch_sizes.count,
+            'mean_batch': self.batch_sizes.mean
+        }
+
+
+class ServiceClient:
+    """Connection of one cell to the scheduling service"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.latency = Histogram()  # Round trip, ns
+    
+    @classmethod
+    async def connect(cls, scheduler_name, config=None, path=SERVICE_SOCKET, port=SERVICE_PORT):
+        client = cls(*await open_connection(path, port))
+        await client.request(['hello', scheduler_name, config_overrides(config)])
+        return client
+    
+    async def request(self, message, raw=b''):
+        write_message(self.writer, message, raw)
+        await self.writer.drain()
+        reply, _ = await read_message(self.reader)
+        if isinstance(reply, dict) and 'error' in reply:
+            raise RuntimeError(f"Scheduling service: {reply['error']}")
+        return reply
+    
+    async def select_index(self, state):
+        start = time.perf_counter_ns()
+        idx = await self.request(['select'], encode_state(state))
+        self.latency.record(time.perf_counter_ns() - start)
+        return idx
+    
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class RemoteCell(Simulator):
+    """Array-engine Simulator whose scheduling decisions come from the service"""
+    def __init__(self, scheduler, rng=None, config=None):
+        super().__init__(scheduler, vectorized=True, rng=rng, frequency_selective=False,
+                         event_driven=False, lookahead=1, config=config)
+    
+    async def advance_remote(self, client, until):
+        """Simulate up to TTI until, asking the service for every decision"""
+        for tti in range(self.next_tti, until):
+            self.current_time = tti
+            self.update_channel()
+            self.generate_arrivals()
+            self.drop_expired()
+            state = self.population.scheduling_state(tti)
+            idx = await client.select_index(state)
+            self.transmit(int(state.ue_ids[idx]) if idx is not None else None)
+            self.next_tti = tti + 1
+
+
+async def drive_cells(scheduler_name, num_cells, ttis, seed=RANDOM_SEED, config=None,
+                      path=SERVICE_SOCKET, port=SERVICE_PORT):
+    """Run num_cells concurrent cells against the service.
+    
+    Cell c uses seed + c. Returns (per-cell metrics, merged round-trip
+    histogram, wall seconds).
+    """
+    config = (config or Config()).replace(SIMULATION_TIME=ttis)
+    cells = [RemoteCell(SCHEDULERS[scheduler_name](config), np.random.default_rng(seed + c), config)
+             for c in range(num_cells)]
+    clients = [await ServiceClient.connect(scheduler_name, config, path, port) for _ in cells]
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(cell.advance_remote(client, ttis) for cell, client in zip(cells, clients)))
+    elapsed = time.perf_counter() - start
+    
+    round_trip = Histogram()
+    for client in clients:
+        round_trip.merge(client.latency)
+        await client.close()
+    return [cell.collect_metrics() for cell in cells], round_trip, elapsed
+
+
+def serve(path=SERVICE_SOCKET, port=SERVICE_PORT, max_batch=SERVICE_MAX_BATCH,
+          batch_window=SERVICE_BATCH_WINDOW):
+    """Run the service until interrupted"""
+    asyncio.run(SchedulingService(max_batch, batch_window).serve(path, port))
+
+
+async def wait_for_service(path=SERVICE_SOCKET, port=SERVICE_PORT, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await open_connection(path, port)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+        else:
+            writer.close()
+            return
+
+
+def drive_cells_process(job):
+    """drive_cells in a load-generator process; job holds its arguments"""
+    return asyncio.run(drive_cells(*job))
+
+
+async def service_stats(path=SERVICE_SOCKET, port=SERVICE_PORT):
+    client = ServiceClient(*await open_connection(path, port))
+    stats = await client.request(['stats'])
+    await client.close()
+    return stats
+
+
+def load_test(scheduler_name, num_cells, ttis, seed=RANDOM_SEED, config=None,
+              path=SERVICE_SOCKET, port=SERVICE_PORT, max_batch=SERVICE_MAX_BATCH,
+              batch_window=SERVICE_BATCH_WINDOW, processes=None):
+    """Start the service in a separate process and drive it with num_cells cells.
+    
+    The cells are split over processes load-generator processes (default:
+    one per core), so their requests really overlap at the service instead
+    of queueing in one client event loop. Cell c still uses seed + c.
+    Returns (per-cell metrics, merged round-trip histogram, wall seconds of
+    the slowest generator, service stats).
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    server = context.Process(target=serve, args=(path, port, max_batch, batch_window), daemon=True)
+    server.start()
+    try:
+        asyncio.run(wait_for_service(path, port))
+        processes = max(1, min(processes or os.cpu_count() or 1, num_cells))
+        groups = [cells for cells in np.array_split(np.arange(num_cells), processes) if cells.size]
+        jobs = [(scheduler_name, cells.size, ttis, seed + int(cells[0]), config, path, port)
+                for cells in groups]
+        with context.Pool(len(jobs)) as pool:
+            results = pool.map(drive_cells_process, jobs)
+        
+        metrics = [m for cell_metrics, _, _ in results for m in cell_metrics]
+        round_trip = Histogram()
+        for _, latency, _ in results:
+            round_trip.merge(latency)
+        elapsed = max(elapsed for _, _, elapsed in results)
+        return metrics, round_trip, elapsed, asyncio.run(service_stats(path, port))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def print_report(num_cells, ttis, metrics, round_trip, elapsed, stats):
+    decisions = num_cells * ttis
+    print(f"{num_cells} cells x {ttis} TTIs: {decisions} decisions in {elapsed:.2f} s "
+          f"({decisions / elapsed:.0f}/s)")
+    print(f"Service: {stats['requests_per_s']:.0f} requests/s, mean batch {stats['mean_batch']:.1f}, "
+          f"latency p50 {stats['latency_p50_us']:.0f} us, p99 {stats['latency_p99_us']:.0f} us, "
+          f"p99.9 {stats['latency_p999_us']:.0f} us, max {stats['latency_max_us']:.0f} us")
+    print(f"Round trip: p50 {round_trip.percentile(50) / 1e3:.0f} us, "
+          f"p99 {round_trip.percentile(99) / 1e3:.0f} us, "
+          f"p99.9 {round_trip.percentile(99.9) / 1e3:.0f} us")
+    throughput = np.mean([m['avg_throughput'] for m in metrics])
+    print(f"Mean UE throughput: {throughput:.2f} bytes/TTI")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batched scheduling service")
+    parser.add_argument('mode', choices=['serve', 'load'])
+    parser.add_argument('--socket', default=SERVICE_SOCKET, help="Unix socket path")
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help="TCP port without Unix sockets")
+    parser.add_argument('--max-batch', type=int, default=SERVICE_MAX_BATCH)
+    parser.add_argument('--batch-window', type=float, default=SERVICE_BATCH_WINDOW,
+                        help="seconds to wait for more requests before evaluating a batch")
+    parser.add_argument('--scheduler', default='Proportional Fair', choices=list(SCHEDULERS))
+    parser.add_argument('--cells', type=int, default=16, help="concurrent simulated cells")
+    parser.add_argument('--ttis', type=int, default=500, help="TTIs simulated per cell")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="load-generator processes sharing the cells (default: one per core)")
+    parser.add_argument('--seed', type=int, default=RANDOM_SEED)
+    args = parser.parse_args(argv)
+    
+    if args.mode == 'serve':
+        serve(args.socket, args.port, args.max_batch, args.batch_window)
+        return 0
+    results = load_test(args.scheduler, args.cells, args.ttis, args.seed, path=args.socket,
+                        port=args.port, max_batch=args.max_batch, batch_window=args.batch_window,
+                        processes=args.processes)
+    print_report(args.cells, args.ttis, *results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,612 @@
 """
 5G NR Downlink Scheduling Simulator
 """
+import time
 import numpy as np
 from user_equipment import UserEquipment
-from config import (NUM_UES, SIMULATION_TIME, PACKET_ARRIVAL_RATE, 
-                    TRAFFIC_TYPES, VERBOSE)
+from ue_population import UEPopulation
+from schedulers import SchedulingState
+from traces import TraceGenerator, TraceFile
+from traffic import TrafficGenerator
+from cohorts import CohortPopulation
+from observers import build_observers, hook_table
+from deadline_wheel import DeadlineWheel
+from active_set import ActiveSet
+from stats import Histogram, RunningStats, StreamingMetrics
+from recorder import TimeSeriesRecorder
+import checkpoint
+from config import Config
+
+
+LATENCY_PHASES = ['cqi_update', 'arrivals', 'expiry', 'select_ue', 'transmit', 'tti']
 
 
 class Simulator:
-    def __init__(self, scheduler):
+    def __init__(self, scheduler, vectorized=None, rng=None, frequency_selective=None,
+                 traces=None, event_driven=None, deadline_wheel=None, instrument=None,
+                 recorder=None, checkpoint_every=None, checkpoint_path=None, lookahead=None,
+                 observers=None, config=None):
+        # Engine options left as None are taken from the config
+        config = config or Config()
+        self.config = config
+        if vectorized is None:
+            vectorized = config.VECTORIZED_UES
+        if frequency_selective is None:
+            frequency_selective = config.FREQUENCY_SELECTIVE
+        if event_driven is None:
+            event_driven = config.EVENT_DRIVEN
+        if deadline_wheel is None:
+            deadline_wheel = config.DEADLINE_WHEEL
+        if instrument is None:
+            instrument = config.INSTRUMENT_LATENCY
+        if checkpoint_every is None:
+            checkpoint_every = config.CHECKPOINT_EVERY
+        if checkpoint_path is None:
+            checkpoint_path = config.CHECKPOINT_PATH
+        if lookahead is None:
+            lookahead = config.LOOKAHEAD_WINDOW
+        if observers is None:
+            observers = build_observers(config.OBSERVERS, config)
+        
         self.scheduler = scheduler
+        # Per-RB allocation needs the UE x RB CQI matrix of the array-backed population
+        self.frequency_selective = frequency_selective
+        vectorized = vectorized or frequency_selective
+        # Private random stream: same seed => same channel and traffic realisation
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.ues = []
+        self.population = None
         self.current_time = 0
-        self.initialize_ues()
+        self.next_tti = 0  # First TTI not yet simulated (resume point)
+        self.measure_start = 0  # First TTI counted in the metrics (after warm-up)
+        # Expiry is checked only for UEs with a deadline due in the current TTI
+        max_delay_threshold = max(t['delay_threshold'] for t in config.TRAFFIC_TYPES.values())
+        self.deadlines = DeadlineWheel(max_delay_threshold) if deadline_wheel else None
+        # Backlogged UEs of the object engine, updated on enqueue, transmit and drop
+        self.active = ActiveSet()
+        # Online delay and throughput statistics in bounded memory
+        self.streaming = StreamingMetrics(config.TRAFFIC_TYPES, config.THROUGHPUT_WINDOW)
+        self.initialize_ues(vectorized)
+        
+        # Packet counts of the whole population per TTI, by per-class arrival model
+        self.traffic = TrafficGenerator(config.TRAFFIC_TYPES, self.rng, config.PACKET_ARRIVAL_RATE)
+        if self.population is not None:
+            self.traffic.assign(self.population.traffic_type)
+        else:
+            self.traffic.assign([ue.traffic_type for ue in self.ues])
+        
+        # Optional trace source replacing per-TTI CQI and arrival draws
+        if traces is None and config.TRACE_DIR:
+            traces = TraceFile(config.TRACE_DIR, config.TRACE_CHUNK_SIZE)
+        elif traces is None and config.PREGENERATED_TRACES:
+            traces = TraceGenerator(config.NUM_UES, self.rng, config.TRACE_CHUNK_SIZE,
+                                    traffic=self.traffic, cqi_min=config.CQI_MIN,
+                                    cqi_max=config.CQI_MAX)
+        if traces is not None and frequency_selective:
+            raise ValueError("Traces hold wideband CQI; frequency_selective mode is not supported")
+        if traces is not None and traces.num_ues != config.NUM_UES:
+            raise ValueError(f"Trace has {traces.num_ues} UEs, simulation has {config.NUM_UES}")
+        self.traces = traces
+        self._trace_window = None
+        self._trace_start = 0
+        
+        # Skipping idle TTIs needs to know future arrivals, i.e. a trace
+        if event_driven and traces is None:
+            raise ValueError("event_driven mode requires a trace source")
+        self.event_driven = event_driven
+        
+        # Windows of planned decisions need the future CQI from a trace
+        if lookahead > 1 and (traces is None or self.population is None or frequency_selective):
+            raise ValueError("lookahead scheduling requires traces and the wideband vectorized engine")
+        self.lookahead = lookahead
+        self._plan = None
+        self._plan_start = 0
+        
+        # Per-phase wall-clock latency histograms (ns), one sample per TTI
+        self.latency = None
+        if instrument:
+            self.latency = {phase: Histogram() for phase in LATENCY_PHASES}
+        
+        # Optional per-TTI, per-UE time-series output
+        if recorder is None and config.RECORD_DIR:
+            recorder = TimeSeriesRecorder(config.RECORD_DIR, config.NUM_UES,
+                                          config.RECORD_BLOCK_SIZE)
+        self.recorder = recorder
+        
+        # Massive low-rate classes as counts per (CQI, queue) state; their
+        # schedulable rows follow the individual UEs' rows
+        self.cohorts = []
+        self.cohort_offsets = []
+        if config.COHORT_TYPES:
+            if (self.population is None or frequency_selective or traces is not None
+                    or lookahead > 1):
+                raise ValueError("Cohorts require the wideband vectorized engine without traces")
+            offset = self.population.num_ues
+            for traffic_type, num_devices in config.COHORT_TYPES.items():
+                cohort = CohortPopulation(traffic_type, num_devices, self.rng, self.streaming, config)
+                self.cohorts.append(cohort)
+                self.cohort_offsets.append(offset)
+                offset += cohort.num_states
+        
+        # Observers switch advance() to the notifying loop; without them it
+        # runs the plain one
+        self.observers = []
+        self._hooks = hook_table([])
+        for observer in observers:
+            self.add_observer(observer)
+        
+        # Periodic checkpoints of the full state for resume()
+        if checkpoint_every and not checkpoint_path:
+            raise ValueError("checkpoint_every requires a checkpoint_path")
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = checkpoint_path
     
-    def initialize_ues(self):
+    def initialize_ues(self, vectorized=False):
         """Create UEs with different traffic types"""
-        traffic_types = list(TRAFFIC_TYPES.keys())
-        for i in range(NUM_UES):
-            # Distribute traffic types: 50% eMBB, 30% URLLC, 20% mMTC
-            if i < NUM_UES * 0.5:
-                traffic_type = 'eMBB'
-            elif i < NUM_UES * 0.8:
-                traffic_type = 'URLLC'
-            else:
-                traffic_type = 'mMTC'
-            
-            ue = UserEquipment(i, traffic_type)
-            self.ues.append(ue)
+        # Distribute traffic types in contiguous blocks by their TRAFFIC_MIX share
+        traffic_mix = self.config.TRAFFIC_MIX
+        num_ues = self.config.NUM_UES
+        cumulative_shares = np.cumsum(list(traffic_mix.values()))
+        traffic_types = []
+        for i in range(num_ues):
+            for traffic_type, share in zip(traffic_mix, cumulative_shares):
+                if i < num_ues * share:
+                    break
+            traffic_types.append(traffic_type)
+        
+        if vectorized:
+            # Array-backed population; self.ues holds UserEquipment-like views
+            num_rbs = self.config.NUM_RBS if self.frequency_selective else None
+            self.population = UEPopulation(traffic_types, self.rng, num_rbs, self.deadlines,
+                                           self.streaming, self.config)
+            self.ues = self.population.ues
+        else:
+            for i, traffic_type in enumerate(traffic_types):
+                ue = UserEquipment(i, traffic_type, self.rng, self.deadlines, self.active,
+                                   self.streaming, self.config)
+                self.ues.append(ue)
     
     def run(self):
         """Execute simulation"""
-        if VERBOSE:
+        if self.config.VERBOSE:
             print(f"\n{'='*60}")
             print(f"Running {self.scheduler.name} Scheduler")
             print(f"{'='*60}")
         
-        for tti in range(SIMULATION_TIME):
+        for hook in self._hooks['on_run_start']:
+            hook(self)
+        self.advance(self.config.SIMULATION_TIME)
+        for hook in self._hooks['on_run_end']:
+            hook(self)
+        
+        if self.recorder is not None:
+            self.recorder.close()
+        
+        if self.config.VERBOSE:
+            print(f"Simulation completed: {self.config.SIMULATION_TIME} TTIs\n")
+        
+        return self.collect_metrics()
+    
+    def advance(self, until):
+        """Simulate from next_tti up to (excluding) TTI until, checkpointing on the way"""
+        if self.observers:
+            step = self.step_observed
+        elif self.latency is not None:
+            step = self.step_instrumented
+        else:
+            step = self.step
+        next_checkpoint = None
+        if self.checkpoint_every:
+            next_checkpoint = (self.next_tti // self.checkpoint_every + 1) * self.checkpoint_every
+        
+        tti = self.next_tti
+        while tti < until:
             self.current_time = tti
+            step()
+            tti += 1
             
-            # Update channel conditions
-            for ue in self.ues:
-                ue.update_cqi()
+            # With every buffer empty nothing but the CQI changes until the next
+            # arrival; the CQI there is read straight from the trace
+            if self.event_driven and not self.has_backlog():
+                next_tti = self.next_arrival_tti(tti, until)
+                self.streaming.record_tti(0, next_tti - tti)
+                tti = next_tti
+                # Every pending deadline belongs to an already-sent packet
+                if self.deadlines is not None:
+                    self.deadlines.clear()
             
-            # Generate packets
+            self.next_tti = tti
+            if next_checkpoint is not None and tti >= next_checkpoint and tti < until:
+                checkpoint.save(self, self.checkpoint_path)
+                next_checkpoint = (tti // self.checkpoint_every + 1) * self.checkpoint_every
+    
+    def reset_statistics(self):
+        """Start measuring from next_tti, keeping buffers, channel and average throughput.
+        
+        Used after a warm-up phase so the metrics cover steady state only.
+        """
+        self.measure_start = self.next_tti
+        self.streaming = StreamingMetrics(self.config.TRAFFIC_TYPES, self.config.THROUGHPUT_WINDOW)
+        if self.latency is not None:
+            self.latency = {phase: Histogram() for phase in LATENCY_PHASES}
+        
+        for cohort in self.cohorts:
+            cohort.reset_statistics(self.streaming)
+        for hook in self._hooks['on_reset_statistics']:
+            hook(self)
+        
+        if self.population is not None:
+            pop = self.population
+            pop.streaming = self.streaming
+            for counter in (pop.total_throughput, pop.transmissions, pop.throughput_sq_sum,
+                            pop.total_delay, pop.delay_sq_sum, pop.served_packets,
+                            pop.dropped_packets):
+                counter[:] = 0
+        else:
             for ue in self.ues:
-                if np.random.random() < PACKET_ARRIVAL_RATE:
-                    ue.generate_packet(self.current_time)
-            
-            # Drop expired packets
+                ue.streaming = self.streaming
+                ue.total_throughput = 0
+                ue.throughput_stats = RunningStats()
+                ue.total_delay = 0
+                ue.delay_stats = RunningStats()
+                ue.served_packets = 0
+                ue.dropped_packets = 0
+    
+    def add_observer(self, observer):
+        """Register an Observer; it is notified from the next advance() on"""
+        self.observers.append(observer)
+        self._hooks = hook_table(self.observers)
+    
+    @classmethod
+    def resume(cls, path):
+        """Load a checkpoint; calling run() on it continues bit-exactly"""
+        return checkpoint.load(path)
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Memory-mapped trace windows are re-sliced after loading, not copied
+        if isinstance(self.traces, TraceFile):
+            state['_trace_window'] = None
+        return state
+    
+    def step(self):
+        """Advance the simulation by one TTI"""
+        self.update_channel()
+        self.generate_arrivals()
+        self.drop_expired()
+        decision = self.schedule()
+        transmitted = self.transmit(decision)
+        if self.recorder is not None:
+            self.record_tti(decision, transmitted)
+    
+    def step_instrumented(self):
+        """Advance by one TTI, recording the wall-clock latency of every phase"""
+        clock = time.perf_counter_ns
+        latency = self.latency
+        t0 = clock()
+        self.update_channel()
+        t1 = clock()
+        self.generate_arrivals()
+        t2 = clock()
+        self.drop_expired()
+        t3 = clock()
+        decision = self.schedule()
+        t4 = clock()
+        transmitted = self.transmit(decision)
+        t5 = clock()
+        if self.recorder is not None:
+            self.record_tti(decision, transmitted)
+        latency['cqi_update'].record(t1 - t0)
+        latency['arrivals'].record(t2 - t1)
+        latency['expiry'].record(t3 - t2)
+        latency['select_ue'].record(t4 - t3)
+        latency['transmit'].record(t5 - t4)
+        latency['tti'].record(t5 - t0)
+    
+    def step_observed(self):
+        """Advance by one TTI, notifying the observers (and recording latency if enabled)"""
+        hooks = self._hooks
+        tti = self.current_time
+        clock = time.perf_counter_ns
+        latency = self.latency
+        track_drops = bool(hooks['on_drop'])
+        
+        for hook in hooks['on_tti_start']:
+            hook(self, tti)
+        dropped = self.dropped_by_class() if track_drops else None
+        tti_ns = 0
+        for phase, run_phase in (('cqi_update', self.update_channel),
+                                 ('arrivals', self.generate_arrivals),
+                                 ('expiry', self.drop_expired)):
+            start = clock()
+            run_phase()
+            elapsed = clock() - start
+            if latency is not None:
+                latency[phase].record(elapsed)
+                tti_ns += elapsed
+            if track_drops and phase != 'cqi_update':
+                dropped = self.notify_drops(phase, dropped)
+            for hook in hooks['on_phase_end']:
+                hook(self, tti, phase)
+        
+        start = clock()
+        decision = self.schedule()
+        elapsed = clock() - start
+        for hook in hooks['on_decision']:
+            hook(self, tti, decision)
+        for hook in hooks['on_phase_end']:
+            hook(self, tti, 'select_ue')
+        
+        start = clock()
+        transmitted = self.transmit(decision)
+        end = clock()
+        if latency is not None:
+            latency['select_ue'].record(elapsed)
+            latency['transmit'].record(end - start)
+            latency['tti'].record(tti_ns + elapsed + end - start)
+        for hook in hooks['on_transmit']:
+            hook(self, tti, decision, transmitted)
+        for hook in hooks['on_phase_end']:
+            hook(self, tti, 'transmit')
+        
+        if self.recorder is not None:
+            self.record_tti(decision, transmitted)
+        for hook in hooks['on_tti_end']:
+            hook(self, tti)
+    
+    def dropped_by_class(self):
+        """Packets dropped so far per traffic class, cohorts included"""
+        if self.population is not None:
+            pop = self.population
+            counts = np.bincount(pop.class_index, weights=pop.dropped_packets,
+                                 minlength=len(pop.class_names))
+            dropped = dict(zip(pop.class_names.tolist(), counts.astype(np.int64).tolist()))
+        else:
+            dropped = dict.fromkeys(self.config.TRAFFIC_TYPES, 0)
+            for ue in self.ues:
+                dropped[ue.traffic_type] += ue.dropped_packets
+        for cohort in self.cohorts:
+            dropped[cohort.traffic_type] += cohort.dropped_packets
+        return dropped
+    
+    def notify_drops(self, phase, before):
+        """Pass the drops since before to the on_drop hooks; returns the new totals"""
+        after = self.dropped_by_class()
+        drops = {name: after[name] - before[name] for name in after if after[name] != before[name]}
+        if drops:
+            for hook in self._hooks['on_drop']:
+                hook(self, self.current_time, phase, drops)
+        return after
+    
+    def update_channel(self):
+        """Phase 1: update channel conditions"""
+        if self.traces is not None:
+            cqi, _ = self.trace_row()
+            if self.population is not None:
+                self.population.cqi = cqi.astype(np.int64)
+            else:
+                for ue, ue_cqi in zip(self.ues, cqi.tolist()):
+                    ue.cqi = ue_cqi
+        elif self.population is not None:
+            self.population.update_cqi()
+        else:
             for ue in self.ues:
+                ue.update_cqi()
+        for cohort in self.cohorts:
+            cohort.update_cqi()
+    
+    def generate_arrivals(self):
+        """Phase 2: generate packets (an aggregated entry per UE with arrivals)"""
+        if self.traces is not None:
+            _, arrivals = self.trace_row()
+        else:
+            arrivals = self.traffic.counts()[0]
+        
+        if self.population is not None:
+            self.population.generate_packets(self.current_time, arrivals)
+        else:
+            for ue, packets in zip(self.ues, arrivals.tolist()):
+                if packets:
+                    ue.generate_packets(self.current_time, int(packets))
+        for cohort in self.cohorts:
+            cohort.generate_packets(self.current_time)
+    
+    def drop_expired(self):
+        """Phase 3: drop expired packets"""
+        for cohort in self.cohorts:
+            cohort.drop_expired(self.current_time)
+        if self.deadlines is None:
+            if self.population is not None:
+                self.population.drop_expired(self.current_time)
+            else:
+                for ue in self.ues:
+                    ue.check_and_drop_expired(self.current_time)
+            return
+        
+        due = self.deadlines.pop_due(self.current_time)
+        if self.population is not None:
+            if due:
+                self.population.drop_expired(self.current_time, np.unique(np.concatenate(due)))
+        else:
+            for ue in due:
                 ue.check_and_drop_expired(self.current_time)
-            
-            # Schedule and transmit
-            selected_ue = self.scheduler.select_ue(self.ues, self.current_time)
-            if selected_ue:
-                data_rate = self.scheduler.get_data_rate(selected_ue.cqi)
-                selected_ue.transmit(self.current_time, data_rate)
+    
+    def trace_row(self):
+        """CQI and arrival rows of the current TTI"""
+        cqi, arrivals = self.trace_window_at(self.current_time)
+        offset = self.current_time - self._trace_start
+        assert offset >= 0, f"TTI {self.current_time} precedes the trace window at {self._trace_start}"
+        return cqi[offset], arrivals[offset]
+    
+    def trace_window_at(self, tti):
+        """Trace window containing tti, loading windows chunk by chunk in order.
         
-        if VERBOSE:
-            print(f"Simulation completed: {SIMULATION_TIME} TTIs\n")
+        Going back before the current window reloads from tti, which only
+        recorded traces allow; a TraceGenerator raises.
+        """
+        if self._trace_window is not None and tti < self._trace_start:
+            self._trace_window = None
+        while self._trace_window is None or tti >= self._trace_start + len(self._trace_window[0]):
+            if self._trace_window is None:
+                start = tti
+            else:
+                start = self._trace_start + len(self._trace_window[0])
+            stop = min(start + self.traces.chunk_size, self.config.SIMULATION_TIME)
+            self._trace_window = self.traces.window(start, stop)
+            self._trace_start = start
+        return self._trace_window
+    
+    def has_backlog(self):
+        """Whether any UE has queued packets"""
+        if self.population is not None:
+            return bool(self.population.count.any())
+        return len(self.active) > 0
+    
+    def next_arrival_tti(self, tti, until):
+        """First TTI in [tti, until) with a packet arrival in the trace, or until.
         
-        return self.collect_metrics()
+        Windows starting at or after until are not loaded, so a later
+        advance() continues in order from there. The idle TTIs passed over
+        are written to the recorder on the way, while their window is loaded.
+        """
+        while tti < until:
+            cqi, arrivals = self.trace_window_at(tti)
+            offset = tti - self._trace_start
+            busy = np.flatnonzero(arrivals[offset:].any(axis=1))
+            stop = min(tti + int(busy[0]) if busy.size else self._trace_start + len(arrivals), until)
+            if self.recorder is not None and stop > tti:
+                self.record_idle(tti, cqi[offset:offset + stop - tti])
+            if busy.size or stop == until:
+                return stop
+            tti = stop
+        return until
+    
+    def schedule(self):
+        """Phase 4: scheduling decision for this TTI, or None.
+        
+        The decision is a UE object (object engine), a population row
+        (array engine) or (rows, data_rates) (frequency-selective mode).
+        """
+        if self.frequency_selective:
+            return self.allocate_rbs()
+        
+        if self.lookahead > 1:
+            row = self.planned_row()
+            if row >= 0 and self.population.count[row]:
+                return row
+        
+        if self.population is not None:
+            state = self.population.scheduling_state(self.current_time)
+            if self.cohorts:
+                state = SchedulingState.concatenate(
+                    [state] + [cohort.scheduling_state(self.current_time, offset)
+                               for cohort, offset in zip(self.cohorts, self.cohort_offsets)])
+            idx = self.scheduler.select_index(state)
+            return int(state.ue_ids[idx]) if idx is not None else None
+        
+        # Only backlogged UEs are offered to the scheduler
+        return self.scheduler.select_ue(self.active.ues(), self.current_time)
+    
+    def planned_row(self):
+        """Population row planned for this TTI, planning the next window when needed (-1 if idle).
+        
+        Plans include the trace's arrivals but not expiry; schedule() falls
+        back to a per-TTI decision whenever the planned UE has nothing to send.
+        """
+        tti = self.current_time
+        if self._plan is None or tti >= self._plan_start + len(self._plan):
+            # Every UE, so ones that get packets inside the window can be planned
+            state = self.population.scheduling_state(tti, all_rows=True)
+            # Windows stop at trace chunk boundaries (chunks are loaded in order)
+            cqi, arrivals = self.trace_window_at(tti)
+            offset = tti - self._trace_start
+            window = slice(offset, offset + self.lookahead)
+            plan = self.scheduler.plan_window(state, cqi[window][:, state.ue_ids],
+                                              self.population.packet_size[state.ue_ids],
+                                              arrivals[window][:, state.ue_ids])
+            # Only planned steps index state
+            self._plan = np.full(plan.size, -1, dtype=np.int64)
+            self._plan[plan >= 0] = state.ue_ids[plan[plan >= 0]]
+            self._plan_start = tti
+        return int(self._plan[tti - self._plan_start])
+    
+    def transmit(self, decision):
+        """Phase 5: transmit for the scheduled UE(s) at their CQI rate.
+        
+        Returns the bytes sent (an array per decision row in frequency-selective mode).
+        """
+        if decision is None:
+            transmitted = 0
+        elif self.frequency_selective:
+            rows, data_rates = decision
+            transmitted = self.population.transmit_many(rows, self.current_time, data_rates)
+        elif self.population is not None and decision >= self.population.num_ues:
+            transmitted = self.transmit_cohort(decision)
+        elif self.population is not None:
+            data_rate = self.scheduler.get_data_rate(int(self.population.cqi[decision]))
+            transmitted = self.population.transmit(decision, self.current_time, data_rate)
+        else:
+            data_rate = self.scheduler.get_data_rate(decision.cqi)
+            transmitted = decision.transmit(self.current_time, data_rate)
+        self.streaming.record_tti(int(np.sum(transmitted)))
+        return transmitted
+    
+    def transmit_cohort(self, decision):
+        """Transmit for the cohort state behind a schedulable row past the individual UEs"""
+        k = int(np.searchsorted(self.cohort_offsets, decision, side='right')) - 1
+        cohort, state = self.cohorts[k], decision - self.cohort_offsets[k]
+        data_rate = self.scheduler.get_data_rate(int(cohort.cqi_of(state)))
+        return cohort.transmit(state, self.current_time, data_rate)
+    
+    def record_tti(self, decision, transmitted):
+        """Append the end-of-TTI state of every UE to the recorder"""
+        bytes_sent = np.zeros(self.config.NUM_UES, dtype=np.int64)
+        selected = -1
+        if decision is not None and self.frequency_selective:
+            rows = decision[0]
+            bytes_sent[rows] = transmitted
+            if rows.size:
+                selected = int(rows[np.argmax(transmitted)])
+        elif decision is not None:
+            selected = decision if self.population is not None else decision.ue_id
+            # Cohort rows are recorded as selected but have no per-UE column
+            if selected < self.config.NUM_UES:
+                bytes_sent[selected] = transmitted
+        
+        if self.population is not None:
+            population = self.population
+            hol_delay = population.get_head_of_line_delays(self.current_time)
+            buffer_size = population.buffer_size
+            cqi = population.cqi
+        else:
+            hol_delay = [ue.get_head_of_line_delay(self.current_time) for ue in self.ues]
+            buffer_size = [ue.buffer_size for ue in self.ues]
+            cqi = [ue.cqi for ue in self.ues]
+        self.recorder.record(self.current_time, selected, bytes_sent, hol_delay, buffer_size, cqi)
+    
+    def record_idle(self, start, cqi):
+        """Append rows for the skipped idle TTIs from start on, one per row of trace CQIs"""
+        if self.population is not None:
+            buffer_size = self.population.buffer_size
+        else:
+            buffer_size = [ue.buffer_size for ue in self.ues]
+        rows = (len(cqi), self.config.NUM_UES)
+        zeros = np.zeros(rows, dtype=np.int64)
+        self.recorder.record_many(np.arange(start, start + len(cqi)), np.full(len(cqi), -1),
+                                  zeros, zeros, np.broadcast_to(buffer_size, rows), cqi)
+    
+    def allocate_rbs(self):
+        """Allocate all NUM_RBS resource blocks; returns (rows, aggregated data rates) or None"""
+        population = self.population
+        state = population.scheduling_state(self.current_time)
+        rb_cqi = population.rb_cqi[state.ue_ids]
+        allocation = self.scheduler.allocate_rbs(state.per_rb(rb_cqi))
+        if allocation is None:
+            return None
+        
+        data_rates = self.scheduler.get_rb_data_rates(rb_cqi, allocation)
+        scheduled = np.flatnonzero(data_rates)
+        return state.ue_ids[scheduled], data_rates[scheduled]
     
     def collect_metrics(self):
         """Collect performance metrics"""
@@ -72,6 +617,7 @@ class Simulator:
             'packet_loss_ratio': [],
             'throughput_per_ue': [],
             'delay_per_ue': [],
+            'delay_std_per_ue': [],
             'served_packets': [],
             'dropped_packets': []
         }
@@ -81,8 +627,9 @@ class Simulator:
         total_served = 0
         total_dropped = 0
         
+        measured_ttis = self.config.SIMULATION_TIME - self.measure_start
         for ue in self.ues:
-            throughput = ue.total_throughput / SIMULATION_TIME
+            throughput = ue.total_throughput / measured_ttis
             metrics['throughput_per_ue'].append(throughput)
             total_throughput += throughput
             
@@ -93,18 +640,44 @@ class Simulator:
                 total_served += ue.served_packets
             else:
                 metrics['delay_per_ue'].append(0)
+            metrics['delay_std_per_ue'].append(ue.delay_stats.std)
             
             metrics['served_packets'].append(ue.served_packets)
             metrics['dropped_packets'].append(ue.dropped_packets)
             total_dropped += ue.dropped_packets
         
-        metrics['avg_throughput'] = total_throughput / NUM_UES
+        metrics['avg_throughput'] = total_throughput / self.config.NUM_UES
         metrics['avg_delay'] = total_delay / total_served if total_served > 0 else 0
         metrics['packet_loss_ratio'] = total_dropped / (total_served + total_dropped) if (total_served + total_dropped) > 0 else 0
         metrics['fairness_index'] = self.calculate_fairness(metrics['throughput_per_ue'])
+        if self.cohorts:
+            metrics['cohorts'] = {cohort.traffic_type: cohort.summary(measured_ttis)
+                                  for cohort in self.cohorts}
+        
+        # Tail delay and windowed throughput; the sketches merge across runs
+        metrics.update(self.streaming.summary())
+        metrics['sketches'] = self.streaming
+        
+        if self.latency is not None:
+            metrics['latency'] = self.latency_summary()
+        if self.observers:
+            metrics['observers'] = {observer.name: observer.summary() for observer in self.observers}
         
         return metrics
     
+    def latency_summary(self):
+        """p50/p99/max latency per phase in microseconds, plus the share of TTIs over budget"""
+        summary = {}
+        for phase, histogram in self.latency.items():
+            summary[phase] = {
+                'p50': histogram.percentile(50) / 1e3,
+                'p99': histogram.percentile(99) / 1e3,
+                'max': histogram.max / 1e3
+            }
+        budget_ns = self.config.TTI_DURATION * 1e6
+        summary['over_budget_ratio'] = self.latency['tti'].fraction_above(budget_ns)
+        return summary
+    
     def calculate_fairness(self, throughputs):
         """Calculate Jain's Fairness Index"""
         n = len(throughputs)
@@ -0,0 +1,252 @@
+"""
+Streaming statistics for 5G NR simulation
+"""
+import math
+import numpy as np
+from config import THROUGHPUT_WINDOW
+
+
+class Histogram:
+    """HDR-style log-linear histogram of non-negative integers with fixed memory.
+    
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) equal buckets,
+    bounding the relative error of any percentile by 2**-(sub_bucket_bits - 1).
+    Values of 2**max_bits and more share the last bucket. Histograms with the
+    same layout can be merged.
+    """
+    def __init__(self, sub_bucket_bits=7, max_bits=48):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_bits = max_bits
+        self.sub_buckets = 1 << sub_bucket_bits
+        self.half = self.sub_buckets >> 1
+        self.num_buckets = self.sub_buckets + (max_bits - sub_bucket_bits) * self.half
+        
+        # Plain list: cheaper than a NumPy array for one increment at a time
+        self.counts = [0] * self.num_buckets
+        self.count = 0
+        self.total = 0
+        self.max = 0
+    
+    def bucket_index(self, value):
+        """Bucket holding a non-negative integer value"""
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        index = self.sub_buckets + (shift - 1) * self.half + (value >> shift) - self.half
+        return min(index, self.num_buckets - 1)
+    
+    def bucket_range(self, index):
+        """(lowest value, width) of a bucket"""
+        if index < self.sub_buckets:
+            return index, 1
+        shift = (index - self.sub_buckets) // self.half + 1
+        mantissa = (index - self.sub_buckets) % self.half + self.half
+        return mantissa << shift, 1 << shift
+    
+    def record_many(self, values, counts=None):
+        """Add an array of non-negative integer samples (counts[k] occurrences of values[k])"""
+        values = np.asarray(values, dtype=np.int64)
+        if counts is not None:
+            counts = np.asarray(counts, dtype=np.int64)
+            values = values[counts > 0]
+            counts = counts[counts > 0]
+        if values.size == 0:
+            return
+        # frexp gives the exact bit length of integers below 2**53
+        bit_length = np.frexp(values.astype(float))[1]
+        shift = np.maximum(bit_length - self.sub_bucket_bits, 0)
+        index = np.where(values < self.sub_buckets, values,
+                         self.sub_buckets + (shift - 1) * self.half + (values >> shift) - self.half)
+        index = np.minimum(index, self.num_buckets - 1)
+        if counts is None:
+            buckets, times = np.unique(index, return_counts=True)
+            self.count += int(values.size)
+            self.total += int(values.sum())
+        else:
+            buckets, inverse = np.unique(index, return_inverse=True)
+            times = np.bincount(inverse, weights=counts).astype(np.int64)
+            self.count += int(counts.sum())
+            self.total += int((values * counts).sum())
+        for bucket, n in zip(buckets.tolist(), times.tolist()):
+            self.counts[bucket] += n
+        self.max = max(self.max, int(values.max()))
+    
+    def record(self, value, times=1):
+        """Add a non-negative integer sample (times occurrences)"""
+        self.counts[self.bucket_index(value)] += times
+        self.count += times
+        self.total += value * times
+        if value > self.max:
+            self.max = value
+    
+    def merge(self, other):
+        """Add the samples of another histogram with the same layout"""
+        if other.num_buckets != self.num_buckets or other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+    
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+    
+    def percentile(self, p):
+        """Value at percentile p (0-100): bucket midpoint, capped at the maximum"""
+        if self.count == 0:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        low, width = self.bucket_range(index)
+        return min(low + (width - 1) / 2, self.max)
+    
+    def fraction_above(self, threshold):
+        """Share of samples in buckets above the one holding threshold"""
+        if self.count == 0:
+            return 0
+        index = self.bucket_index(int(threshold))
+        return sum(self.counts[index + 1:]) / self.count
+
+
+class RunningStats:
+    """Running count, mean and variance (Welford), mergeable (Chan et al.)"""
+    __slots__ = ('count', 'mean', 'm2')
+    
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+    
+    @classmethod
+    def from_moments(cls, count, total, total_sq):
+        """Build from exact count, sum and sum of squares"""
+        if count == 0:
+            return cls()
+        mean = total / count
+        return cls(count, mean, max(total_sq - count * mean * mean, 0.0))
+    
+    def add(self, value, times=1):
+        """Add a sample (times occurrences)"""
+        if times != 1:
+            self.merge(RunningStats(times, value, 0.0))
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+    
+    def merge(self, other):
+        """Combine with the statistics of another sample set"""
+        count = self.count + other.count
+        if count == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+    
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class StreamingMetrics:
+    """Online per-class delay and cell throughput statistics in bounded memory.
+    
+    Packet delays go into one Histogram sketch and RunningStats per traffic
+    class; cell throughput is sketched per TTI and per window of
+    THROUGHPUT_WINDOW TTIs. Instances from independent runs can be merged.
+    """
+    def __init__(self, traffic_types, window=THROUGHPUT_WINDOW):
+        self.delay = {t: Histogram() for t in traffic_types}
+        self.delay_stats = {t: RunningStats() for t in traffic_types}
+        self.tti_throughput = Histogram()
+        self.window = window
+        self.window_throughput = Histogram()
+        self.window_stats = RunningStats()
+        self._window_bytes = 0
+        self._window_ttis = 0
+    
+    def record_delay(self, traffic_type, delay, times=1):
+        """Delay of times served packets"""
+        self.delay[traffic_type].record(delay, times)
+        self.delay_stats[traffic_type].add(delay, times)
+    
+    def record_delays(self, traffic_type, delays, counts=None):
+        """Delays of several served packets of one class (counts[k] packets with delays[k])"""
+        delays = np.asarray(delays)
+        if delays.size == 0:
+            return
+        self.delay[traffic_type].record_many(delays, counts)
+        if counts is None:
+            num_packets, total, total_sq = delays.size, delays.sum(), np.square(delays, dtype=float).sum()
+        else:
+            counts = np.asarray(counts)
+            num_packets, total = counts.sum(), (delays * counts).sum()
+            total_sq = (np.square(delays, dtype=float) * counts).sum()
+        self.delay_stats[traffic_type].merge(RunningStats.from_moments(
+            int(num_packets), float(total), float(total_sq)))
+    
+    def record_tti(self, sent_bytes, ttis=1):
+        """Bytes sent by the cell in each of ttis consecutive TTIs"""
+        self.tti_throughput.record(int(sent_bytes), ttis)
+        while ttis:
+            step = min(ttis, self.window - self._window_ttis)
+            self._window_bytes += sent_bytes * step
+            self._window_ttis += step
+            ttis -= step
+            if self._window_ttis == self.window:
+                window_mean = self._window_bytes / self.window
+                self.window_throughput.record(int(round(window_mean)))
+                self.window_stats.add(window_mean)
+                self._window_bytes = 0
+                self._window_ttis = 0
+    
+    def merge(self, other):
+        """Add the statistics of another run (complete windows only)"""
+        for t in other.delay:
+            self.delay.setdefault(t, Histogram()).merge(other.delay[t])
+            self.delay_stats.setdefault(t, RunningStats()).merge(other.delay_stats[t])
+        self.tti_throughput.merge(other.tti_throughput)
+        self.window_throughput.merge(other.window_throughput)
+        self.window_stats.merge(other.window_stats)
+        return self
+    
+    def summary(self):
+        """Tail delay per class and throughput distribution for the metrics dict"""
+        delay_percentiles = {}
+        for t, histogram in self.delay.items():
+            delay_percentiles[t] = {
+                'mean': self.delay_stats[t].mean,
+                'std': self.delay_stats[t].std,
+                'p50': histogram.percentile(50),
+                'p95': histogram.percentile(95),
+                'p99': histogram.percentile(99)
+            }
+        urllc = delay_percentiles.get('URLLC', {'p95': 0, 'p99': 0})
+        return {
+            'delay_percentiles': delay_percentiles,
+            'urllc_delay_p95': urllc['p95'],
+            'urllc_delay_p99': urllc['p99'],
+            'tti_throughput': {
+                'p50': self.tti_throughput.percentile(50),
+                'p99': self.tti_throughput.percentile(99),
+                'max': self.tti_throughput.max
+            },
+            'windowed_throughput': {
+                'window': self.window,
+                'mean': self.window_stats.mean,
+                'std': self.window_stats.std,
+                'p5': self.window_throughput.percentile(5),
+                'p50': self.window_throughput.percentile(50),
+                'p95': self.window_throughput.percentile(95)
+            }
+        }
@@ -0,0 +1,112 @@
+"""
+Parameter sweeps with a content-addressed on-disk result cache
+"""
+import glob
+import hashlib
+import itertools
+import json
+import os
+import pickle
+from runner import run_jobs, run_name, run_options, aggregate_metrics
+from config import Config, SWEEP_CACHE_DIR
+
+
+def code_version():
+    """Hash of the simulator's Python sources; any code change invalidates the cache"""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(config, scheduler_name, seed, version, options=None):
+    """Content address of one (config, scheduler, seed, code version) run"""
+    payload = json.dumps({
+        'config': config.to_dict(),
+        'options': options or {},
+        'scheduler': scheduler_name,
+        'seed': seed,
+        'code_version': version
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Metrics of single runs stored as one pickle file per cache key"""
+    def __init__(self, directory=SWEEP_CACHE_DIR):
+        self.directory = directory
+    
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+    
+    def get(self, key):
+        """Cached metrics, or None"""
+        try:
+            with open(self.path(key), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+    
+    def put(self, key, metrics):
+        """Store metrics atomically"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(metrics, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+def expand_grid(grid):
+    """Every combination of a {parameter: [values]} grid, as override dicts"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def sweep(grid, scheduler_names, seeds, base=None, options=None, cache_dir=SWEEP_CACHE_DIR,
+          max_workers=None):
+    """Run every grid point x scheduler x seed, computing only runs missing from the cache.
+    
+    grid maps Config parameter names to lists of values; base is the Config
+    the overrides apply to, options extra Simulator keyword options. Returns
+    a list of (overrides, per-scheduler aggregated metrics) per grid point.
+    """
+    base = base or Config()
+    options = options or {}
+    cache = ResultCache(cache_dir) if cache_dir else None
+    version = code_version()
+    
+    points = expand_grid(grid)
+    configs = [base.replace(**overrides) for overrides in points]
+    keys = {}
+    runs = {}
+    missing = []
+    for p, config in enumerate(configs):
+        for name in scheduler_names:
+            for seed in seeds:
+                key = cache_key(config, name, seed, version, options)
+                keys[(p, name, seed)] = key
+                cached = cache.get(key) if cache is not None else None
+                if cached is not None:
+                    runs[key] = cached
+                else:
+                    job_options = run_options({**options, 'config': config},
+                                              run_name(name, seed, f"point{p}_"))
+                    missing.append((key, (name, seed, job_options, None)))
+    
+    # Identical runs (e.g. a grid value equal to the base) are computed once
+    jobs = dict(missing)
+    computed = run_jobs(list(jobs.values()), max_workers) if jobs else []
+    for key, metrics in zip(jobs, computed):
+        runs[key] = metrics
+        if cache is not None:
+            cache.put(key, metrics)
+    
+    results = []
+    for p, overrides in enumerate(points):
+        per_scheduler = [aggregate_metrics([runs[keys[(p, name, seed)]] for seed in seeds])
+                         for name in scheduler_names]
+        results.append((overrides, per_scheduler))
+    return results
@@ -0,0 +1,117 @@
+"""
+Pre-generated channel and traffic traces for 5G NR simulation
+"""
+import os
+import numpy as np
+from config import (CQI_MIN, CQI_MAX, PACKET_ARRIVAL_RATE, TRACE_CHUNK_SIZE)
+
+
+CQI_FILE = 'cqi.npy'
+ARRIVALS_FILE = 'arrivals.npy'
+
+
+class TraceGenerator:
+    """Bulk-generated CQI random walks and packet arrivals, one chunk of TTIs at a time.
+    
+    Steps and arrivals for a whole chunk are drawn with one RNG call each;
+    only the clipped CQI recursion runs row by row, as a vector over all UEs.
+    Arrivals are Bernoulli masks at arrival_rate, or the packet counts of a
+    TrafficGenerator if one is given. Windows must be requested in order, so
+    memory stays at one chunk.
+    """
+    def __init__(self, num_ues, rng, chunk_size=TRACE_CHUNK_SIZE,
+                 arrival_rate=PACKET_ARRIVAL_RATE, traffic=None, cqi_min=CQI_MIN, cqi_max=CQI_MAX):
+        self.num_ues = num_ues
+        self.rng = rng
+        self.chunk_size = chunk_size
+        self.arrival_rate = arrival_rate
+        self.traffic = traffic
+        self.arrival_dtype = traffic.dtype if traffic is not None else bool
+        self.cqi_min = cqi_min
+        self.cqi_max = cqi_max
+        
+        self.initial_cqi = rng.integers(cqi_min, cqi_max + 1, size=num_ues)
+        self._cqi = self.initial_cqi.astype(np.int8)
+        self.next_tti = 0
+    
+    def window(self, start, stop):
+        """CQI (int8) and arrival (bool or count) matrices of shape (stop - start, num_ues)"""
+        if start != self.next_tti:
+            raise ValueError(f"TraceGenerator windows must be sequential: "
+                             f"expected TTI {self.next_tti}, got {start}")
+        num_ttis = stop - start
+        
+        # Same step distribution as UserEquipment.update_cqi
+        steps = self.rng.choice(np.array([-1, 0, 1], dtype=np.int8),
+                                size=(num_ttis, self.num_ues), p=[0.2, 0.6, 0.2])
+        cqi = np.empty((num_ttis, self.num_ues), dtype=np.int8)
+        previous = self._cqi
+        for t in range(num_ttis):
+            # Clip with plain ufuncs; np.clip's per-call overhead dominates here
+            row = cqi[t]
+            np.add(previous, steps[t], out=row)
+            np.minimum(row, self.cqi_max, out=row)
+            np.maximum(row, self.cqi_min, out=row)
+            previous = row
+        
+        if self.traffic is not None:
+            arrivals = self.traffic.counts(num_ttis)
+        else:
+            arrivals = self.rng.random((num_ttis, self.num_ues)) < self.arrival_rate
+        
+        if num_ttis:
+            self._cqi = cqi[-1].copy()
+        self.next_tti = stop
+        return cqi, arrivals
+
+
+class TraceFile:
+    """Replay of recorded traces through read-only np.memmap views.
+    
+    Windows are zero-copy slices of the mapped files, so any number of
+    scheduler processes replaying one scenario share it through the page
+    cache, and scenarios larger than RAM are paged in window by window.
+    """
+    def __init__(self, directory, chunk_size=TRACE_CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self._open()
+    
+    def _open(self):
+        self.cqi = np.load(os.path.join(self.directory, CQI_FILE), mmap_mode='r')
+        self.arrivals = np.load(os.path.join(self.directory, ARRIVALS_FILE), mmap_mode='r')
+        self.num_ttis, self.num_ues = self.cqi.shape
+    
+    def window(self, start, stop):
+        """CQI and arrival views for TTIs [start, stop); any order is allowed"""
+        if stop > self.num_ttis:
+            raise ValueError(f"Trace in {self.directory} has {self.num_ttis} TTIs, "
+                             f"TTI {stop - 1} requested")
+        return self.cqi[start:stop], self.arrivals[start:stop]
+    
+    def __getstate__(self):
+        # Ship only the path to worker processes; they map the files themselves
+        return {'directory': self.directory, 'chunk_size': self.chunk_size}
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+def record_traces(directory, generator, num_ttis):
+    """Stream num_ttis TTIs of a TraceGenerator into .npy files and open them for replay"""
+    os.makedirs(directory, exist_ok=True)
+    shape = (num_ttis, generator.num_ues)
+    cqi = np.lib.format.open_memmap(os.path.join(directory, CQI_FILE),
+                                    mode='w+', dtype=np.int8, shape=shape)
+    arrivals = np.lib.format.open_memmap(os.path.join(directory, ARRIVALS_FILE),
+                                         mode='w+', dtype=generator.arrival_dtype, shape=shape)
+    
+    for start in range(0, num_ttis, generator.chunk_size):
+        stop = min(start + generator.chunk_size, num_ttis)
+        cqi[start:stop], arrivals[start:stop] = generator.window(start, stop)
+    
+    cqi.flush()
+    arrivals.flush()
+    del cqi, arrivals
+    return TraceFile(directory, generator.chunk_size)
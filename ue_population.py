@@ -0,0 +1,408 @@
+"""
+Array-backed UE population for large-scale 5G NR simulation
+"""
+import numpy as np
+from schedulers import SchedulingState
+from stats import RunningStats
+from config import Config
+
+
+class UEPopulation:
+    """Struct-of-arrays UE state: one NumPy array per UE field.
+    
+    Packet buffers are stored as one ring of aggregated (arrival time,
+    packets) entries per UE (every packet of a UE has the same size), so
+    CQI updates, arrivals and expiry run as whole-population vector
+    operations however many packets arrive per TTI.
+    """
+    def __init__(self, traffic_types, rng, num_rbs=None, deadlines=None, streaming=None,
+                 config=None):
+        config = config or Config()
+        self.rng = rng
+        self.deadlines = deadlines  # Optional DeadlineWheel of UE index arrays
+        self.streaming = streaming  # Optional StreamingMetrics of the cell
+        self.num_ues = len(traffic_types)
+        self.traffic_types = config.TRAFFIC_TYPES
+        self.traffic_type = np.array(traffic_types, dtype=object)
+        self.class_names = np.array(sorted(config.TRAFFIC_TYPES))
+        self.class_index = np.searchsorted(self.class_names, np.array(traffic_types, dtype=str))
+        self.priority = np.array([config.TRAFFIC_TYPES[t]['priority'] for t in traffic_types])
+        self.delay_threshold = np.array([config.TRAFFIC_TYPES[t]['delay_threshold'] for t in traffic_types])
+        self.packet_size = np.array([config.TRAFFIC_TYPES[t]['packet_size'] for t in traffic_types])
+        self.max_buffer_size = config.MAX_BUFFER_SIZE
+        self.cqi_min = config.CQI_MIN
+        self.cqi_max = config.CQI_MAX
+        
+        self.buffer_size = np.zeros(self.num_ues, dtype=np.int64)
+        
+        self.total_throughput = np.zeros(self.num_ues, dtype=np.int64)
+        self.avg_throughput = np.full(self.num_ues, 0.001)
+        # Exact moments for per-UE variance in O(1) memory
+        self.transmissions = np.zeros(self.num_ues, dtype=np.int64)
+        self.throughput_sq_sum = np.zeros(self.num_ues, dtype=np.int64)
+        
+        self.total_delay = np.zeros(self.num_ues, dtype=np.int64)
+        self.delay_sq_sum = np.zeros(self.num_ues, dtype=np.int64)
+        self.served_packets = np.zeros(self.num_ues, dtype=np.int64)
+        self.dropped_packets = np.zeros(self.num_ues, dtype=np.int64)
+        
+        self.cqi = rng.integers(self.cqi_min, self.cqi_max + 1, size=self.num_ues)
+        
+        # Frequency-selective channel: one CQI random walk per UE and RB,
+        # started around the UE's wideband CQI
+        self.rb_cqi = None
+        if num_rbs:
+            offsets = rng.integers(-2, 3, size=(self.num_ues, num_rbs))
+            self.rb_cqi = np.clip(self.cqi[:, None] + offsets, self.cqi_min, self.cqi_max)
+            self.cqi = self.wideband_cqi()
+        
+        # Packet queues: ring of (arrival time, packets) entries, wide enough
+        # for a full buffer of single-packet entries
+        self.queue_width = int((self.max_buffer_size // self.packet_size).max()) if self.num_ues else 1
+        self.arrival_times = np.zeros((self.num_ues, self.queue_width), dtype=np.int64)
+        self.arrival_packets = np.zeros((self.num_ues, self.queue_width), dtype=np.int64)
+        self.head = np.zeros(self.num_ues, dtype=np.int64)
+        self.entries = np.zeros(self.num_ues, dtype=np.int64)
+        self.count = np.zeros(self.num_ues, dtype=np.int64)  # Queued packets
+        # Bytes of the head packet already sent as segments (per-RB transmission)
+        self.head_sent = np.zeros(self.num_ues, dtype=np.int64)
+        self._rows = np.arange(self.num_ues)
+        
+        self.ues = [UEView(self, i) for i in range(self.num_ues)]
+    
+    def update_cqi(self):
+        """Update channel quality of all UEs with temporal correlation"""
+        change = self.rng.choice([-1, 0, 1], size=self.num_ues, p=[0.2, 0.6, 0.2])
+        self.cqi = np.clip(self.cqi + change, self.cqi_min, self.cqi_max)
+        
+        if self.rb_cqi is not None:
+            # Same step distribution, drawn as uniforms for the whole matrix
+            u = self.rng.random(self.rb_cqi.shape)
+            rb_change = (u >= 0.8).astype(np.int64) - (u < 0.2)
+            self.rb_cqi = np.clip(self.rb_cqi + rb_change, self.cqi_min, self.cqi_max)
+            self.cqi = self.wideband_cqi()
+    
+    def wideband_cqi(self):
+        """Wideband CQI of every UE: rounded mean over its RBs"""
+        return np.rint(self.rb_cqi.mean(axis=1)).astype(np.int64)
+    
+    def generate_packets(self, current_time, arrivals):
+        """Enqueue arrivals[i] packets (count or boolean mask) of every UE as one entry.
+        
+        Packets that do not fit in the buffer are dropped.
+        """
+        space = (self.max_buffer_size - self.buffer_size) // self.packet_size
+        admitted = np.minimum(arrivals, space)
+        self.dropped_packets += arrivals - admitted
+        
+        idx = np.flatnonzero(admitted)
+        packets = admitted[idx]
+        tail = (self.head[idx] + self.entries[idx]) % self.queue_width
+        self.arrival_times[idx, tail] = current_time
+        self.arrival_packets[idx, tail] = packets
+        self.entries[idx] += 1
+        self.count[idx] += packets
+        self.buffer_size[idx] += packets * self.packet_size[idx]
+        
+        if self.deadlines is not None and idx.size:
+            expiry = current_time + self.delay_threshold[idx] + 1
+            for expiry_tti in np.unique(expiry):
+                self.deadlines.schedule(int(expiry_tti), idx[expiry == expiry_tti])
+    
+    def drop_expired(self, current_time, candidates=None):
+        """Drop head-of-line entries exceeding their delay threshold.
+        
+        Only the UE indices in candidates (unique) are checked, if given.
+        """
+        rows = self._rows if candidates is None else candidates
+        while rows.size:
+            hol_delay = current_time - self.arrival_times[rows, self.head[rows]]
+            rows = rows[(self.entries[rows] > 0) & (hol_delay > self.delay_threshold[rows])]
+            if not rows.size:
+                break
+            packets = self.arrival_packets[rows, self.head[rows]]
+            self.head[rows] = (self.head[rows] + 1) % self.queue_width
+            self.entries[rows] -= 1
+            self.count[rows] -= packets
+            self.buffer_size[rows] -= packets * self.packet_size[rows] - self.head_sent[rows]
+            self.head_sent[rows] = 0
+            self.dropped_packets[rows] += packets
+    
+    def head_arrival_times(self):
+        """Arrival time of the oldest queued packet of every UE (stale if empty)"""
+        return self.arrival_times[self._rows, self.head]
+    
+    def get_head_of_line_delays(self, current_time):
+        """Head-of-line delay of every UE, 0 for empty buffers"""
+        return np.where(self.count > 0, current_time - self.head_arrival_times(), 0)
+    
+    def scheduling_state(self, current_time, all_rows=False):
+        """Scheduler inputs for the backlogged UEs (every UE with all_rows); state.ue_ids maps back to rows"""
+        if all_rows:
+            rows = np.arange(self.num_ues)
+            backlogged = self.count > 0
+            hol_delay = np.where(backlogged, current_time - self.arrival_times[rows, self.head], 0)
+        else:
+            rows = np.flatnonzero(self.count > 0)
+            backlogged = np.ones(rows.size, dtype=bool)
+            hol_delay = current_time - self.arrival_times[rows, self.head[rows]]
+        return SchedulingState(
+            ue_ids=rows,
+            cqi=self.cqi[rows],
+            avg_throughput=self.avg_throughput[rows],
+            hol_delay=hol_delay,
+            delay_threshold=self.delay_threshold[rows],
+            priority=self.priority[rows],
+            buffer_size=self.buffer_size[rows],
+            backlogged=backlogged
+        )
+    
+    def transmit(self, i, current_time, data_rate):
+        """Transmit as many whole packets of UE i as fit in data_rate"""
+        num_packets = min(int(self.count[i]), data_rate // int(self.packet_size[i]))
+        if num_packets == 0:
+            return 0
+        
+        # Whole entries from the head; the last one may be taken in part
+        slots = (self.head[i] + np.arange(min(int(self.entries[i]), num_packets))) % self.queue_width
+        packets = self.arrival_packets[i, slots]
+        taken = np.minimum(packets, num_packets - (np.cumsum(packets) - packets))
+        taken = np.maximum(taken, 0)
+        transmitted = num_packets * int(self.packet_size[i])
+        
+        delays = current_time - self.arrival_times[i, slots]
+        self.total_delay[i] += (delays * taken).sum()
+        self.delay_sq_sum[i] += (delays * delays * taken).sum()
+        if self.streaming is not None:
+            self.streaming.record_delays(str(self.traffic_type[i]), delays, taken)
+        self.served_packets[i] += num_packets
+        self.arrival_packets[i, slots] = packets - taken
+        done = int(np.count_nonzero(taken == packets))
+        self.head[i] = (self.head[i] + done) % self.queue_width
+        self.entries[i] -= done
+        self.count[i] -= num_packets
+        self.buffer_size[i] -= transmitted
+        
+        self.total_throughput[i] += transmitted
+        self.transmissions[i] += 1
+        self.throughput_sq_sum[i] += transmitted * transmitted
+        self.avg_throughput[i] = 0.9 * self.avg_throughput[i] + 0.1 * transmitted
+        
+        return transmitted
+    
+    def transmit_many(self, indices, current_time, data_rates):
+        """Transmit data_rates bytes for several distinct UEs, segmenting packets.
+        
+        Unlike transmit, a packet may be sent over several TTIs; it counts as
+        served (with its delay) in the TTI its last segment is sent.
+        """
+        ps = self.packet_size[indices]
+        transmitted = np.minimum(data_rates, self.buffer_size[indices])
+        sent = self.head_sent[indices] + transmitted
+        num_packets = sent // ps
+        
+        # Packets taken from every entry of every ring, in queue order
+        offsets = np.arange(self.queue_width)
+        rows = indices[:, None]
+        slots = (self.head[indices][:, None] + offsets) % self.queue_width
+        packets = np.where(offsets < self.entries[indices][:, None], self.arrival_packets[rows, slots], 0)
+        taken = np.clip(num_packets[:, None] - (np.cumsum(packets, axis=1) - packets), 0, packets)
+        used = taken > 0
+        delays = np.where(used, current_time - self.arrival_times[rows, slots], 0)
+        
+        self.total_delay[indices] += (delays * taken).sum(axis=1)
+        self.delay_sq_sum[indices] += (delays * delays * taken).sum(axis=1)
+        if self.streaming is not None and num_packets.any():
+            classes = self.class_index[indices]
+            for c, name in enumerate(self.class_names):
+                in_class = classes == c
+                self.streaming.record_delays(str(name), delays[in_class][used[in_class]],
+                                             taken[in_class][used[in_class]])
+        self.served_packets[indices] += num_packets
+        self.arrival_packets[rows, slots] = packets - taken
+        done = np.count_nonzero(used & (taken == packets), axis=1)
+        self.head[indices] = (self.head[indices] + done) % self.queue_width
+        self.entries[indices] -= done
+        self.count[indices] -= num_packets
+        self.head_sent[indices] = sent % ps
+        self.buffer_size[indices] -= transmitted
+        
+        self.total_throughput[indices] += transmitted
+        served = transmitted > 0
+        self.transmissions[indices] += served
+        self.throughput_sq_sum[indices] += transmitted * transmitted
+        self.avg_throughput[indices[served]] = 0.9 * self.avg_throughput[indices[served]] + 0.1 * transmitted[served]
+        
+        return transmitted
+    
+    
+    # Per-UE arrays and the value of a new, empty row in each
+    ROW_FIELDS = {
+        'traffic_type': None, 'class_index': 0, 'priority': 0, 'delay_threshold': 1,
+        'packet_size': 1, 'buffer_size': 0, 'total_throughput': 0, 'avg_throughput': 0.001,
+        'transmissions': 0, 'throughput_sq_sum': 0, 'total_delay': 0, 'delay_sq_sum': 0,
+        'served_packets': 0, 'dropped_packets': 0, 'cqi': 1, 'arrival_times': 0,
+        'arrival_packets': 0, 'head': 0, 'entries': 0, 'count': 0, 'head_sent': 0
+    }
+    COUNTER_FIELDS = ['total_throughput', 'transmissions', 'throughput_sq_sum', 'total_delay',
+                      'delay_sq_sum', 'served_packets', 'dropped_packets']
+    
+    def resize(self, num_ues):
+        """Append empty rows up to num_ues (frequency-selective populations are fixed-size)"""
+        extra = num_ues - self.num_ues
+        if extra <= 0:
+            return
+        if self.rb_cqi is not None:
+            raise ValueError("Cannot resize a frequency-selective population")
+        for name, fill in self.ROW_FIELDS.items():
+            array = getattr(self, name)
+            rows = np.full((extra,) + array.shape[1:], fill, dtype=array.dtype)
+            setattr(self, name, np.concatenate([array, rows]))
+        self.ues += [UEView(self, i) for i in range(self.num_ues, num_ues)]
+        self.num_ues = num_ues
+        self._rows = np.arange(num_ues)
+    
+    def widen_queues(self, queue_width):
+        """Make every ring at least queue_width entries long (rings keep their order)"""
+        if queue_width <= self.queue_width:
+            return
+        offsets = np.arange(self.queue_width)
+        slots = (self.head[:, None] + offsets) % self.queue_width
+        for name in ('arrival_times', 'arrival_packets'):
+            ring = np.zeros((self.num_ues, queue_width), dtype=np.int64)
+            ring[:, :self.queue_width] = getattr(self, name)[self._rows[:, None], slots]
+            setattr(self, name, ring)
+        self.head[:] = 0
+        self.queue_width = queue_width
+    
+    def export_ue(self, i):
+        """Move the traffic, channel and queue state of row i out (e.g. for handover).
+        
+        Statistics counters stay behind; the row is left empty.
+        """
+        slots = (self.head[i] + np.arange(self.entries[i])) % self.queue_width
+        state = {
+            'traffic_type': str(self.traffic_type[i]),
+            'cqi': int(self.cqi[i]),
+            'avg_throughput': float(self.avg_throughput[i]),
+            'arrival_times': self.arrival_times[i, slots].copy(),
+            'arrival_packets': self.arrival_packets[i, slots].copy(),
+            'head_sent': int(self.head_sent[i])
+        }
+        self.entries[i] = 0
+        self.count[i] = 0
+        self.head_sent[i] = 0
+        self.buffer_size[i] = 0
+        return state
+    
+    def import_ue(self, i, state):
+        """Place a UE exported with export_ue into the empty row i"""
+        traffic_type = state['traffic_type']
+        params = self.traffic_types[traffic_type]
+        self.traffic_type[i] = traffic_type
+        self.class_index[i] = np.searchsorted(self.class_names, traffic_type)
+        self.priority[i] = params['priority']
+        self.delay_threshold[i] = params['delay_threshold']
+        self.packet_size[i] = params['packet_size']
+        self.cqi[i] = state['cqi']
+        self.avg_throughput[i] = state['avg_throughput']
+        
+        arrival_times = state['arrival_times']
+        packets = state['arrival_packets']
+        self.head[i] = 0
+        self.entries[i] = len(arrival_times)
+        self.count[i] = packets.sum()
+        self.arrival_times[i, :len(arrival_times)] = arrival_times
+        self.arrival_packets[i, :len(packets)] = packets
+        self.head_sent[i] = state['head_sent']
+        self.buffer_size[i] = self.count[i] * params['packet_size'] - state['head_sent']
+    
+    def take_counters(self, i):
+        """Return and zero the statistics counters of row i"""
+        counters = {name: int(getattr(self, name)[i]) for name in self.COUNTER_FIELDS}
+        for name in self.COUNTER_FIELDS:
+            getattr(self, name)[i] = 0
+        return counters
+
+
+class UEView:
+    """Read-only UserEquipment facade over one row of a UEPopulation"""
+    __slots__ = ('population', 'ue_id')
+    
+    def __init__(self, population, ue_id):
+        self.population = population
+        self.ue_id = ue_id
+    
+    @property
+    def traffic_type(self):
+        return str(self.population.traffic_type[self.ue_id])
+    
+    @property
+    def priority(self):
+        return int(self.population.priority[self.ue_id])
+    
+    @property
+    def delay_threshold(self):
+        return int(self.population.delay_threshold[self.ue_id])
+    
+    @property
+    def packet_size(self):
+        return int(self.population.packet_size[self.ue_id])
+    
+    @property
+    def buffer(self):
+        """Number of queued packets (truthy when backlogged)"""
+        return int(self.population.count[self.ue_id])
+    
+    @property
+    def buffer_size(self):
+        return int(self.population.buffer_size[self.ue_id])
+    
+    @property
+    def cqi(self):
+        return int(self.population.cqi[self.ue_id])
+    
+    @property
+    def avg_throughput(self):
+        return float(self.population.avg_throughput[self.ue_id])
+    
+    @property
+    def total_throughput(self):
+        return int(self.population.total_throughput[self.ue_id])
+    
+    @property
+    def total_delay(self):
+        return int(self.population.total_delay[self.ue_id])
+    
+    @property
+    def served_packets(self):
+        return int(self.population.served_packets[self.ue_id])
+    
+    @property
+    def dropped_packets(self):
+        return int(self.population.dropped_packets[self.ue_id])
+    
+    @property
+    def delay_stats(self):
+        pop = self.population
+        return RunningStats.from_moments(int(pop.served_packets[self.ue_id]),
+                                         float(pop.total_delay[self.ue_id]),
+                                         float(pop.delay_sq_sum[self.ue_id]))
+    
+    @property
+    def throughput_stats(self):
+        pop = self.population
+        return RunningStats.from_moments(int(pop.transmissions[self.ue_id]),
+                                         float(pop.total_throughput[self.ue_id]),
+                                         float(pop.throughput_sq_sum[self.ue_id]))
+    
+    def get_head_of_line_delay(self, current_time):
+        """Get delay of the oldest packet in buffer"""
+        pop = self.population
+        if pop.count[self.ue_id]:
+            return current_time - int(pop.arrival_times[self.ue_id, pop.head[self.ue_id]])
+        return 0
+    
+    def transmit(self, current_time, data_rate):
+        """Transmit data and update statistics"""
+        return self.population.transmit(self.ue_id, current_time, data_rate)
@@ -2,76 +2,161 @@
 User Equipment (UE) class for 5G NR simulation
 """
 import numpy as np
-from config import TRAFFIC_TYPES, MAX_BUFFER_SIZE
+from stats import RunningStats
+from config import Config
 
 
-class Packet:
-    def __init__(self, size, arrival_time, traffic_type):
-        self.size = size
-        self.arrival_time = arrival_time
-        self.traffic_type = traffic_type
+class PacketQueue:
+    """FIFO packet buffer stored as a preallocated ring of aggregated entries.
+    
+    Each (arrival time, size, count) slot holds count packets of one size
+    that arrived in the same TTI; len() is the number of queued packets.
+    """
+    def __init__(self, capacity):
+        self.capacity = max(capacity, 1)
+        self.arrival_times = [0] * self.capacity
+        self.sizes = [0] * self.capacity
+        self.counts = [0] * self.capacity
+        self.head = 0
+        self.entries = 0
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self, size, arrival_time, count=1):
+        """Enqueue count packets at the tail as one entry"""
+        if self.entries == self.capacity:
+            self._grow()
+        tail = (self.head + self.entries) % self.capacity
+        self.arrival_times[tail] = arrival_time
+        self.sizes[tail] = size
+        self.counts[tail] = count
+        self.entries += 1
+        self.count += count
+    
+    def head_arrival_time(self):
+        """Arrival time of the oldest packet (queue must not be empty)"""
+        return self.arrival_times[self.head]
+    
+    def head_size(self):
+        """Size of the oldest packet (queue must not be empty)"""
+        return self.sizes[self.head]
+    
+    def popleft(self):
+        """Dequeue the oldest entry, returning (packet size, packets)"""
+        head = self.head
+        self.head = (head + 1) % self.capacity
+        self.entries -= 1
+        self.count -= self.counts[head]
+        return self.sizes[head], self.counts[head]
+    
+    def pop_fitting(self, budget):
+        """Dequeue head packets while they fit in budget bytes, splitting the last entry if needed.
+        
+        Returns (total_size, [(arrival_time, packets)] of the dequeued packets).
+        """
+        total_size = 0
+        taken = []
+        head = self.head
+        while self.entries:
+            size = self.sizes[head]
+            packets = min(self.counts[head], (budget - total_size) // size)
+            if packets == 0:
+                break
+            total_size += packets * size
+            taken.append((self.arrival_times[head], packets))
+            self.count -= packets
+            if packets < self.counts[head]:
+                self.counts[head] -= packets
+                break
+            head = (head + 1) % self.capacity
+            self.entries -= 1
+        self.head = head
+        return total_size, taken
+    
+    def _grow(self):
+        """Double the ring capacity, unrolling it so the head is at slot 0"""
+        order = [(self.head + i) % self.capacity for i in range(self.entries)]
+        self.arrival_times = [self.arrival_times[i] for i in order] + [0] * self.capacity
+        self.sizes = [self.sizes[i] for i in order] + [0] * self.capacity
+        self.counts = [self.counts[i] for i in order] + [0] * self.capacity
+        self.head = 0
+        self.capacity *= 2
 
 
 class UserEquipment:
-    def __init__(self, ue_id, traffic_type):
+    def __init__(self, ue_id, traffic_type, rng, deadlines=None, active=None,
+                 streaming=None, config=None):
+        config = config or Config()
         self.ue_id = ue_id
+        self.rng = rng
+        self.deadlines = deadlines  # Optional DeadlineWheel shared by all UEs
+        self.active = active  # Optional ActiveSet of backlogged UEs
+        self.streaming = streaming  # Optional StreamingMetrics of the cell
         self.traffic_type = traffic_type
-        self.priority = TRAFFIC_TYPES[traffic_type]['priority']
-        self.delay_threshold = TRAFFIC_TYPES[traffic_type]['delay_threshold']
-        self.packet_size = TRAFFIC_TYPES[traffic_type]['packet_size']
+        self.priority = config.TRAFFIC_TYPES[traffic_type]['priority']
+        self.delay_threshold = config.TRAFFIC_TYPES[traffic_type]['delay_threshold']
+        self.packet_size = config.TRAFFIC_TYPES[traffic_type]['packet_size']
         
-        self.buffer = []
+        self.max_buffer_size = config.MAX_BUFFER_SIZE
+        self.buffer = PacketQueue(self.max_buffer_size // self.packet_size)
         self.buffer_size = 0
         
         self.total_throughput = 0
-        self.throughput_history = []
+        self.throughput_stats = RunningStats()  # Bytes per transmission
         self.avg_throughput = 0.001
         
         self.total_delay = 0
+        self.delay_stats = RunningStats()
         self.served_packets = 0
         self.dropped_packets = 0
         
-        self.cqi = np.random.randint(1, 16)
+        self.cqi_min = config.CQI_MIN
+        self.cqi_max = config.CQI_MAX
+        self.cqi = rng.integers(self.cqi_min, self.cqi_max + 1)
     
-    def generate_packet(self, current_time):
-        """Generate a new packet and add to buffer"""
-        packet = Packet(self.packet_size, current_time, self.traffic_type)
-        if self.buffer_size + packet.size <= MAX_BUFFER_SIZE:
-            self.buffer.append(packet)
-            self.buffer_size += packet.size
-        else:
-            self.dropped_packets += 1
+    def generate_packets(self, current_time, count=1):
+        """Add count new packets to the buffer as one entry, dropping what does not fit"""
+        admitted = min(count, (self.max_buffer_size - self.buffer_size) // self.packet_size)
+        self.dropped_packets += count - admitted
+        if admitted:
+            self.buffer.append(self.packet_size, current_time, admitted)
+            self.buffer_size += admitted * self.packet_size
+            if self.deadlines is not None:
+                self.deadlines.schedule(current_time + self.delay_threshold + 1, self)
+            if self.active is not None and len(self.buffer) == admitted:
+                self.active.add(self)
     
     def update_cqi(self):
         """Update channel quality with temporal correlation"""
-        change = np.random.choice([-1, 0, 1], p=[0.2, 0.6, 0.2])
-        self.cqi = np.clip(self.cqi + change, 1, 15)
+        change = self.rng.choice([-1, 0, 1], p=[0.2, 0.6, 0.2])
+        self.cqi = np.clip(self.cqi + change, self.cqi_min, self.cqi_max)
     
     def get_head_of_line_delay(self, current_time):
         """Get delay of the oldest packet in buffer"""
         if self.buffer:
-            return current_time - self.buffer[0].arrival_time
+            return current_time - self.buffer.head_arrival_time()
         return 0
     
     def transmit(self, current_time, data_rate):
         """Transmit data and update statistics"""
-        transmitted = 0
-        while self.buffer and transmitted < data_rate:
-            packet = self.buffer[0]
-            if transmitted + packet.size <= data_rate:
-                self.buffer.pop(0)
-                self.buffer_size -= packet.size
-                transmitted += packet.size
-                
-                delay = current_time - packet.arrival_time
-                self.total_delay += delay
-                self.served_packets += 1
-            else:
-                break
+        transmitted, taken = self.buffer.pop_fitting(data_rate)
+        if taken:
+            self.buffer_size -= transmitted
+            for arrival_time, packets in taken:
+                delay = current_time - arrival_time
+                self.total_delay += delay * packets
+                self.delay_stats.add(delay, packets)
+                if self.streaming is not None:
+                    self.streaming.record_delay(self.traffic_type, delay, packets)
+                self.served_packets += packets
+            if self.active is not None and not self.buffer:
+                self.active.discard(self)
         
         if transmitted > 0:
             self.total_throughput += transmitted
-            self.throughput_history.append(transmitted)
+            self.throughput_stats.add(transmitted)
             self.avg_throughput = 0.9 * self.avg_throughput + 0.1 * transmitted
         
         return transmitted
@@ -79,10 +164,11 @@ class UserEquipment:
     def check_and_drop_expired(self, current_time):
         """Drop packets exceeding delay threshold"""
         while self.buffer:
-            packet = self.buffer[0]
-            if current_time - packet.arrival_time > self.delay_threshold:
-                self.buffer.pop(0)
-                self.buffer_size -= packet.size
-                self.dropped_packets += 1
+            if current_time - self.buffer.head_arrival_time() > self.delay_threshold:
+                size, packets = self.buffer.popleft()
+                self.buffer_size -= size * packets
+                self.dropped_packets += packets
+                if self.active is not None and not self.buffer:
+                    self.active.discard(self)
             else:
                 break
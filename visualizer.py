@@ -1,27 +1,60 @@
 """
 Visualization module for simulation results
+
+matplotlib is imported on first use only, so batch runs that print tables
+never pay its start-up cost; file reports use the non-interactive Agg backend.
 """
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from config import REPORT_FORMATS
+
+
+FIGURES = ['throughput_comparison', 'delay_comparison', 'packet_loss_comparison',
+           'fairness_comparison', 'per_ue_throughput', 'per_ue_delay']
+
+
+def pyplot(headless=False):
+    """matplotlib.pyplot, imported (and styled) on first call; headless selects Agg"""
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    if not getattr(pyplot, 'styled', False):
+        plt.style.use('seaborn-v0_8-darkgrid')
+        pyplot.styled = True
+    return plt
+
+
+def save_figure(plt, path_stem, formats):
+    """Write the current figure once per format and close it"""
+    for fmt in formats:
+        plt.savefig(f"{path_stem}.{fmt}", dpi=120)
+    plt.close()
 
 
 class Visualizer:
     def __init__(self, results):
         self.results = results
-        plt.style.use('seaborn-v0_8-darkgrid')
     
-    def plot_all(self):
-        """Generate all comparison plots"""
-        self.plot_throughput_comparison()
-        self.plot_delay_comparison()
-        self.plot_packet_loss_comparison()
-        self.plot_fairness_comparison()
-        self.plot_per_ue_throughput()
-        self.plot_per_ue_delay()
-        plt.show()
+    def plot_all(self, block=True):
+        """Generate all comparison plots and show them (block=False returns immediately)"""
+        plt = pyplot()
+        for name in FIGURES:
+            getattr(self, 'plot_' + name)()
+        plt.show(block=block)
+    
+    def save_all(self, directory, formats=REPORT_FORMATS):
+        """Render every comparison plot to directory/<figure>.<format> without a display"""
+        plt = pyplot(headless=True)
+        os.makedirs(directory, exist_ok=True)
+        for name in FIGURES:
+            getattr(self, 'plot_' + name)()
+            save_figure(plt, os.path.join(directory, name), formats)
     
     def plot_throughput_comparison(self):
         """Bar chart: Average throughput"""
+        plt = pyplot()
         schedulers = [r['scheduler'] for r in self.results]
         throughputs = [r['avg_throughput'] for r in self.results]
         
@@ -43,6 +76,7 @@ class Visualizer:
     
     def plot_delay_comparison(self):
         """Bar chart: Average packet delay"""
+        plt = pyplot()
         schedulers = [r['scheduler'] for r in self.results]
         delays = [r['avg_delay'] for r in self.results]
         
@@ -64,6 +98,7 @@ class Visualizer:
     
     def plot_packet_loss_comparison(self):
         """Bar chart: Packet loss ratio"""
+        plt = pyplot()
         schedulers = [r['scheduler'] for r in self.results]
         loss_ratios = [r['packet_loss_ratio'] * 100 for r in self.results]
         
@@ -85,6 +120,7 @@ class Visualizer:
     
     def plot_fairness_comparison(self):
         """Bar chart: Jain's Fairness Index"""
+        plt = pyplot()
         schedulers = [r['scheduler'] for r in self.results]
         fairness = [r['fairness_index'] for r in self.results]
         
@@ -107,6 +143,7 @@ class Visualizer:
     
     def plot_per_ue_throughput(self):
         """Line plot: Per-UE throughput distribution"""
+        plt = pyplot()
         plt.figure(figsize=(10, 5))
         
         for result in self.results:
@@ -123,14 +160,17 @@ class Visualizer:
     
     def plot_per_ue_delay(self):
         """Box plot: Per-UE delay distribution"""
+        plt = pyplot()
         plt.figure(figsize=(10, 5))
         
         data = [result['delay_per_ue'] for result in self.results]
         labels = [result['scheduler'] for result in self.results]
         
-        bp = plt.boxplot(data, labels=labels, patch_artist=True,
+        bp = plt.boxplot(data, patch_artist=True,
                         boxprops=dict(facecolor='lightblue', alpha=0.7),
                         medianprops=dict(color='red', linewidth=2))
+        # Tick labels set separately: boxplot's labels argument was renamed in matplotlib 3.9
+        plt.xticks(range(1, len(labels) + 1), labels)
         
         plt.ylabel('Packet Delay (TTI)', fontsize=11)
         plt.title('Per-UE Delay Distribution', fontsize=13, fontweight='bold')
@@ -151,5 +191,96 @@ class Visualizer:
                   f"{result['avg_delay']:<12.2f} "
                   f"{result['packet_loss_ratio']*100:<12.2f} "
                   f"{result['fairness_index']:<10.3f}")
+            if 'ci' in result:
+                # Confidence-interval half-widths of the replicated metrics
+                half = {key: (high - low) / 2 for key, (low, high) in result['ci'].items()}
+                print(f"{'':<25} "
+                      f"{'±' + format(half['avg_throughput'], '.2f'):<15} "
+                      f"{'±' + format(half['avg_delay'], '.2f'):<12} "
+                      f"{'±' + format(half['packet_loss_ratio'] * 100, '.2f'):<12} "
+                      f"{'±' + format(half['fairness_index'], '.3f'):<10}")
         
         print("="*80 + "\n")
+    
+    def print_latency_table(self):
+        """Print per-phase scheduler latency (results from instrumented runs)"""
+        phases = ['cqi_update', 'arrivals', 'expiry', 'select_ue', 'transmit', 'tti']
+        
+        print("\n" + "="*80)
+        print("PER-TTI PHASE LATENCY (us, p50 / p99 / max)")
+        print("="*80)
+        for result in self.results:
+            if 'latency' not in result:
+                continue
+            latency = result['latency']
+            print(f"{result['scheduler']}  "
+                  f"(TTIs over budget: {latency['over_budget_ratio']*100:.2f}%)")
+            for phase in phases:
+                stats = latency[phase]
+                print(f"  {phase:<12} {stats['p50']:>10.1f} {stats['p99']:>10.1f} {stats['max']:>10.1f}")
+        print("="*80 + "\n")
+
+
+def plot_sweep(sweep_results, parameter, metric='avg_throughput'):
+    """Line plot of a metric against one swept parameter, one line per scheduler.
+    
+    sweep_results is the output of sweep.sweep; points differing in other
+    parameters are drawn as separate lines.
+    """
+    plt = pyplot()
+    lines = {}
+    for overrides, per_scheduler in sweep_results:
+        others = ', '.join(f'{k}={v}' for k, v in overrides.items() if k != parameter)
+        for result in per_scheduler:
+            label = result['scheduler'] + (f' ({others})' if others else '')
+            lines.setdefault(label, []).append((overrides[parameter], result[metric]))
+    
+    plt.figure(figsize=(10, 5))
+    for label, points in lines.items():
+        x, y = zip(*sorted(points))
+        plt.plot(x, y, marker='o', label=label, linewidth=2, markersize=4)
+    plt.xlabel(parameter, fontsize=11)
+    plt.ylabel(metric, fontsize=11)
+    plt.title(f'{metric} vs {parameter}', fontsize=13, fontweight='bold')
+    plt.legend(fontsize=9)
+    plt.grid(alpha=0.3)
+    plt.tight_layout()
+
+
+def save_sweep_report(sweep_results, directory, metrics=None, formats=REPORT_FORMATS):
+    """Render plot_sweep for every swept parameter and metric to files"""
+    plt = pyplot(headless=True)
+    os.makedirs(directory, exist_ok=True)
+    metrics = metrics or ['avg_throughput', 'avg_delay', 'packet_loss_ratio', 'fairness_index']
+    parameters = list(sweep_results[0][0]) if sweep_results else []
+    for parameter in parameters:
+        for metric in metrics:
+            plot_sweep(sweep_results, parameter, metric)
+            save_figure(plt, os.path.join(directory, f'{metric}_vs_{parameter}'), formats)
+
+
+def _render(job):
+    """Worker: one report directory from ('results' | 'sweep', data, directory, formats)"""
+    kind, data, directory, formats = job
+    if kind == 'sweep':
+        save_sweep_report(data, directory, formats=formats)
+    else:
+        Visualizer(data).save_all(directory, formats)
+    return directory
+
+
+def render_reports(reports, formats=REPORT_FORMATS, max_workers=None):
+    """Render many reports to files in a process pool with the Agg backend.
+    
+    reports maps output directories to per-scheduler results lists (as for
+    Visualizer) or to sweep.sweep outputs. Returns the directories written.
+    """
+    jobs = []
+    for directory, data in reports.items():
+        kind = 'sweep' if data and isinstance(data[0], tuple) else 'results'
+        jobs.append((kind, data, directory, formats))
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(jobs) <= 1:
+        return [_render(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_render, jobs))